@@ -1,12 +1,12 @@
 import os
 import json
-import urllib
 
 import numpy as np
-import pandas as pd
 import plotly.express as px
 import streamlit as st
-from sqlalchemy import create_engine, text
+
+import pulse_data
+import pulse_profile
 
 # =========================================
 # PAGE CONFIG
@@ -16,31 +16,8 @@ st.set_page_config(
     page_title="PhonePe Pulse Dashboard",
 )
 
-# =========================================
-# DB CONNECTION
-# =========================================
-odbc_str = (
-    "DRIVER={ODBC Driver 17 for SQL Server};"
-    r"SERVER=VASI\SQLEXPRESS;"
-    "DATABASE=phonepe;"
-    "Trusted_Connection=yes;"
-)
-params = urllib.parse.quote_plus(odbc_str)
-engine = create_engine(
-    f"mssql+pyodbc:///?odbc_connect={params}",
-    fast_executemany=True,
-)
-
-# =========================================
-# TABLE MAP
-# =========================================
-TABLES = {
-    "agg_trans": "Agg_trans",
-    "agg_insu": "Agg_insu",
-    "map_user": "map_user",
-    "map_tran": "map_tran",
-    "top_tran": "top_tran",
-}
+# opt-in sampling profiler: PHONEPE_PROFILE=1 or ?profile=1 (see pulse_profile.py)
+profiler = pulse_profile.start_rerun(st.query_params, root_file=__file__)
 
 # =========================================
 # LOCAL INDIA GEOJSON
@@ -93,27 +70,6 @@ STATE_FIX = {
     "West Bengal": "West Bengal",
 }
 
-# =========================================
-# HELPERS
-# =========================================
-@st.cache_data(ttl=300)
-def run_sql(sql: str):
-    """Run SQL and return (df, error_or_None)."""
-    try:
-        df = pd.read_sql(text(sql), engine)
-        return df, None
-    except Exception as e:
-        return None, e
-
-
-def detect_column(df: pd.DataFrame, candidates):
-    """Pick first existing column name from candidate list."""
-    for c in candidates:
-        if c in df.columns:
-            return c
-    return None
-
-
 # =========================================
 # SIDEBAR
 # =========================================
@@ -130,26 +86,19 @@ page = st.sidebar.radio(
     ],
 )
 
-# global filters
-years_df, _ = run_sql(f"SELECT DISTINCT [Year] FROM {TABLES['agg_trans']} ORDER BY [Year];")
-years = sorted(years_df["Year"].astype(str).tolist()) if years_df is not None else []
+page_name = page.split(" ", 1)[1]
+if profiler:
+    profiler.name = page_name
 
-states_df, _ = run_sql(f"SELECT DISTINCT [State] FROM {TABLES['agg_trans']} ORDER BY [State];")
-states = sorted(states_df["State"].astype(str).tolist()) if states_df is not None else []
+# global filters
+pulse_profile.section("Sidebar / filters")
+years = pulse_data.available_years()
+states = pulse_data.available_states()
 
 selected_year = st.sidebar.selectbox("Year", ["All"] + years)
 selected_state = st.sidebar.selectbox("State", ["All"] + states)
 
 
-def sql_filters():
-    conds = []
-    if selected_year != "All":
-        conds.append(f"[Year] = '{selected_year}'")
-    if selected_state != "All":
-        conds.append(f"[State] = '{selected_state}'")
-    return (" AND " + " AND ".join(conds)) if conds else ""
-
-
 # =========================================
 # 🏠 HOME  (MAP + KPIs)
 # =========================================
@@ -157,14 +106,8 @@ if page == "🏠 Home":
     st.title("📍 India — State-wise Transaction Amount")
 
     # ---- KPIs (1 query) ----
-    q_kpi = f"""
-        SELECT
-            SUM(CAST([Transacion_count] AS BIGINT))  AS total_tx,
-            SUM(CAST([Transacion_amount] AS BIGINT)) AS total_amt
-        FROM {TABLES['agg_trans']}
-        WHERE 1=1 {sql_filters()};
-    """
-    df_kpi, err = run_sql(q_kpi)
+    pulse_profile.section("Home / KPIs")
+    df_kpi, err = pulse_data.home_kpi(selected_year, selected_state)
     if err or df_kpi is None or df_kpi.empty:
         st.error("Could not load KPI data.")
     else:
@@ -180,16 +123,8 @@ if page == "🏠 Home":
     st.markdown("---")
 
     # ---- State-level aggregation for MAP (2nd query) ----
-    q_state = f"""
-        SELECT [State],
-               SUM(CAST([Transacion_amount] AS BIGINT)) AS total_amount,
-               SUM(CAST([Transacion_count]  AS BIGINT)) AS total_count
-        FROM {TABLES['agg_trans']}
-        WHERE 1=1 {sql_filters()}
-        GROUP BY [State]
-        ORDER BY total_amount DESC;
-    """
-    df_state, err = run_sql(q_state)
+    pulse_profile.section("Home / state totals")
+    df_state, err = pulse_data.home_state_totals(selected_year, selected_state)
 
     if err or df_state is None or df_state.empty:
         st.error("No transaction data available for map.")
@@ -204,6 +139,7 @@ if page == "🏠 Home":
             st.warning("Unmatched states")
             st.dataframe(unmatched)
 
+        pulse_profile.section("Home / choropleth build")
         fig = px.choropleth(
             df_state,
             geojson=india_geo,
@@ -217,6 +153,7 @@ if page == "🏠 Home":
         )
         fig.update_geos(fitbounds="locations", visible=False)
         fig.update_layout(margin=dict(l=0, r=0, t=40, b=0), height=550)
+        pulse_profile.section("Home / choropleth render")
         st.plotly_chart(fig, use_container_width=True)
 
 # =========================================
@@ -226,15 +163,8 @@ elif page == "📈 Transaction Dynamics":
     st.title("📈 Transaction Dynamics")
 
     # 1) Top states by transaction amount
-    q1 = f"""
-        SELECT [State],
-               SUM(CAST([Transacion_amount] AS BIGINT)) AS amt
-        FROM {TABLES['agg_trans']}
-        WHERE 1=1 {sql_filters()}
-        GROUP BY [State]
-        ORDER BY amt DESC;
-    """
-    df1, e1 = run_sql(q1)
+    pulse_profile.section("Transaction Dynamics / 1 top states by transaction amount")
+    df1, e1 = pulse_data.tx_top_states(selected_year, selected_state)
     st.subheader("1️⃣ Top States by Transaction Amount")
     if e1 or df1 is None or df1.empty:
         st.warning("No data for top states.")
@@ -245,15 +175,8 @@ elif page == "📈 Transaction Dynamics":
         )
 
     # 2) Quarterly trend (amount)
-    q2 = f"""
-        SELECT [Year], [Quater],
-               SUM(CAST([Transacion_amount] AS BIGINT)) AS amt
-        FROM {TABLES['agg_trans']}
-        WHERE 1=1 {sql_filters()}
-        GROUP BY [Year], [Quater]
-        ORDER BY [Year], [Quater];
-    """
-    df2, e2 = run_sql(q2)
+    pulse_profile.section("Transaction Dynamics / 2 quarterly trend")
+    df2, e2 = pulse_data.tx_quarterly_amount(selected_year, selected_state)
     st.subheader("2️⃣ Quarterly Transaction Amount Trend")
     if e2 or df2 is None or df2.empty:
         st.warning("No quarterly data.")
@@ -265,15 +188,8 @@ elif page == "📈 Transaction Dynamics":
         )
 
     # 3) Transaction type split (amount)
-    q3 = f"""
-        SELECT [Transacion_type],
-               SUM(CAST([Transacion_amount] AS BIGINT)) AS amt
-        FROM {TABLES['agg_trans']}
-        WHERE 1=1 {sql_filters()}
-        GROUP BY [Transacion_type]
-        ORDER BY amt DESC;
-    """
-    df3, e3 = run_sql(q3)
+    pulse_profile.section("Transaction Dynamics / 3 transaction type split")
+    df3, e3 = pulse_data.tx_type_split(selected_year, selected_state)
     st.subheader("3️⃣ Transaction Type Split (by Amount)")
     if e3 or df3 is None or df3.empty:
         st.warning("No type-wise data.")
@@ -284,14 +200,8 @@ elif page == "📈 Transaction Dynamics":
         )
 
     # 4) State x Type heatmap (count)
-    q4 = f"""
-        SELECT [State], [Transacion_type],
-               SUM(CAST([Transacion_count] AS BIGINT)) AS cnt
-        FROM {TABLES['agg_trans']}
-        WHERE 1=1 {sql_filters()}
-        GROUP BY [State], [Transacion_type];
-    """
-    df4, e4 = run_sql(q4)
+    pulse_profile.section("Transaction Dynamics / 4 state x type heatmap")
+    df4, e4 = pulse_data.tx_state_type_counts(selected_year, selected_state)
     st.subheader("4️⃣ State vs Transaction Type (Heatmap)")
     if e4 or df4 is None or df4.empty:
         st.warning("No data for heatmap.")
@@ -306,25 +216,8 @@ elif page == "📈 Transaction Dynamics":
         )
 
     # 5) YoY growth by state (count)
-    q5 = f"""
-        WITH yearly AS (
-            SELECT [State], [Year],
-                   SUM(CAST([Transacion_count] AS BIGINT)) AS cnt
-            FROM {TABLES['agg_trans']}
-            GROUP BY [State], [Year]
-        )
-        SELECT a.[State], a.[Year],
-               a.cnt AS curr_cnt,
-               b.cnt AS prev_cnt,
-               (a.cnt - ISNULL(b.cnt,0)) AS delta
-        FROM yearly a
-        LEFT JOIN yearly b
-               ON a.[State] = b.[State]
-              AND a.[Year]  = b.[Year] + 1
-        WHERE 1=1 {"" if selected_state == "All" else f"AND a.State = '{selected_state}'"}
-        ORDER BY delta DESC;
-    """
-    df5, e5 = run_sql(q5)
+    pulse_profile.section("Transaction Dynamics / 5 yoy growth by state")
+    df5, e5 = pulse_data.tx_yoy_count(selected_year, selected_state)
     st.subheader("5️⃣ Year-on-Year Transaction Growth (Count)")
     if e5 or df5 is None or df5.empty:
         st.warning("No YoY growth data.")
@@ -338,63 +231,41 @@ elif page == "📈 Transaction Dynamics":
 elif page == "👥 User Engagement":
     st.title("👥 User Engagement")
 
-    # Load raw map_user (no column names in SQL, to avoid invalid-column errors)
-    q_mu = f"SELECT * FROM {TABLES['map_user']} WHERE 1=1 {sql_filters()};"
-    mu, e_mu = run_sql(q_mu)
-
-    # Utility: detect correct column names
-    state_col = detect_column(mu, ["State", "state"])
-    year_col = detect_column(mu, ["Year", "year"])
-    district_col = detect_column(mu, ["Districts", "District", "districts"])
-    ru_col = detect_column(mu, ["RegisteredUsers", "RegisteredUserst", "registeredusers"])
-    opens_col = detect_column(mu, ["AppOpens", "appopens"])
+    # map_user is streamed and aggregated in the query layer (see pulse_data.user_engagement)
+    pulse_profile.section("User Engagement / stream map_user")
+    df1, e_mu = pulse_data.ue_users_by_state(selected_year, selected_state)
 
-    if e_mu or mu is None or mu.empty or not all([state_col, ru_col, opens_col]):
+    if e_mu or df1 is None or df1.empty:
         st.error(
             "Could not read `map_user` properly. "
             "Check columns State / RegisteredUsers / AppOpens (or RegisteredUserst)."
         )
     else:
         # 1) Registered users by state
+        pulse_profile.section("User Engagement / 1 registered users by state")
         st.subheader("1️⃣ Registered Users by State")
-        df1 = (
-            mu.groupby(state_col, as_index=False)[ru_col]
-            .sum()
-            .rename(columns={state_col: "State", ru_col: "users"})
-            .sort_values("users", ascending=False)
-        )
         st.bar_chart(df1.set_index("State")["users"])
 
         # 2) App opens by state
+        pulse_profile.section("User Engagement / 2 app opens by state")
         st.subheader("2️⃣ App Opens by State")
-        df2 = (
-            mu.groupby(state_col, as_index=False)[opens_col]
-            .sum()
-            .rename(columns={state_col: "State", opens_col: "opens"})
-            .sort_values("opens", ascending=False)
-        )
+        df2, _ = pulse_data.ue_opens_by_state(selected_year, selected_state)
         st.bar_chart(df2.set_index("State")["opens"])
 
         # 3) Opens per registered user
+        pulse_profile.section("User Engagement / 3 opens per registered user")
         st.subheader("3️⃣ Opens per Registered User (State)")
-        df3 = pd.merge(df1, df2, on="State", how="inner")
-        df3["opens_per_user"] = (df3["opens"] / df3["users"]).replace(
-            [np.inf, -np.inf], 0
-        )
+        df3, _ = pulse_data.ue_opens_per_user(selected_year, selected_state)
         st.plotly_chart(
             px.bar(df3, x="State", y="opens_per_user"),
             use_container_width=True,
         )
 
         # 4) Top districts by users
+        pulse_profile.section("User Engagement / 4 top districts by users")
         st.subheader("4️⃣ Top Districts by Registered Users")
-        if district_col and district_col in mu.columns:
-            df4 = (
-                mu.groupby(district_col, as_index=False)[ru_col]
-                .sum()
-                .rename(columns={district_col: "Districts", ru_col: "users"})
-                .sort_values("users", ascending=False)
-            )
+        df4, e4 = pulse_data.ue_top_districts(selected_year, selected_state)
+        if not e4 and df4 is not None:
             st.plotly_chart(
                 px.bar(df4.head(25), x="Districts", y="users"),
                 use_container_width=True,
@@ -403,6 +274,7 @@ elif page == "👥 User Engagement":
             st.warning("No `Districts` column in map_user, skipping district chart.")
 
         # 5) Users vs Opens scatter
+        pulse_profile.section("User Engagement / 5 users vs opens scatter")
         st.subheader("5️⃣ Users vs Opens (State Bubble Plot)")
         st.plotly_chart(
             px.scatter(
@@ -422,16 +294,9 @@ elif page == "🛡 Insurance Analysis":
     st.title("🛡 Insurance Analysis")
 
     # 1) Insurance transactions by state
+    pulse_profile.section("Insurance Analysis / 1 insurance transactions by state")
     st.subheader("1️⃣ Insurance Transaction Count by State")
-    q1 = f"""
-        SELECT [State],
-               SUM(CAST([Transacion_count] AS BIGINT)) AS cnt
-        FROM {TABLES['agg_insu']}
-        WHERE 1=1 {sql_filters()}
-        GROUP BY [State]
-        ORDER BY cnt DESC;
-    """
-    df1, e1 = run_sql(q1)
+    df1, e1 = pulse_data.insu_count_by_state(selected_year, selected_state)
     if e1 or df1 is None or df1.empty:
         st.warning("No insurance data by state.")
     else:
@@ -441,16 +306,9 @@ elif page == "🛡 Insurance Analysis":
         )
 
     # 2) Insurance amount by state
+    pulse_profile.section("Insurance Analysis / 2 insurance amount by state")
     st.subheader("2️⃣ Insurance Amount by State")
-    q2 = f"""
-        SELECT [State],
-               SUM(CAST([Transacion_amount] AS BIGINT)) AS amt
-        FROM {TABLES['agg_insu']}
-        WHERE 1=1 {sql_filters()}
-        GROUP BY [State]
-        ORDER BY amt DESC;
-    """
-    df2, e2 = run_sql(q2)
+    df2, e2 = pulse_data.insu_amount_by_state(selected_year, selected_state)
     if e2 or df2 is None or df2.empty:
         st.warning("No insurance amount data.")
     else:
@@ -460,16 +318,9 @@ elif page == "🛡 Insurance Analysis":
         )
 
     # 3) Yearly insurance trend
+    pulse_profile.section("Insurance Analysis / 3 yearly insurance trend")
     st.subheader("3️⃣ Insurance Amount Trend by Year")
-    q3 = f"""
-        SELECT [Year],
-               SUM(CAST([Transacion_amount] AS BIGINT)) AS amt
-        FROM {TABLES['agg_insu']}
-        WHERE 1=1 {sql_filters()}
-        GROUP BY [Year]
-        ORDER BY [Year];
-    """
-    df3, e3 = run_sql(q3)
+    df3, e3 = pulse_data.insu_yearly_amount(selected_year, selected_state)
     if e3 or df3 is None or df3.empty:
         st.warning("No yearly insurance trend.")
     else:
@@ -479,34 +330,9 @@ elif page == "🛡 Insurance Analysis":
         )
 
     # 4) Insurance penetration vs all transactions
+    pulse_profile.section("Insurance Analysis / 4 insurance penetration vs all transactions")
     st.subheader("4️⃣ Insurance Penetration vs Total Transactions")
-    q4 = f"""
-        WITH insu AS (
-            SELECT [State],
-                   SUM(CAST([Transacion_count] AS BIGINT)) AS insu_cnt
-            FROM {TABLES['agg_insu']}
-            WHERE 1=1 {sql_filters()}
-            GROUP BY [State]
-        ),
-        all_tx AS (
-            SELECT [State],
-                   SUM(CAST([Transacion_count] AS BIGINT)) AS all_cnt
-            FROM {TABLES['agg_trans']}
-            WHERE 1=1 {sql_filters()}
-            GROUP BY [State]
-        )
-        SELECT a.[State],
-               insu_cnt,
-               all_cnt,
-               CASE WHEN all_cnt=0 THEN 0
-                    ELSE 1.0*insu_cnt/all_cnt
-               END AS penetration
-        FROM insu a
-        JOIN all_tx b
-          ON a.[State] = b.[State]
-        ORDER BY penetration DESC;
-    """
-    df4, e4 = run_sql(q4)
+    df4, e4 = pulse_data.insu_penetration(selected_year, selected_state)
     if e4 or df4 is None or df4.empty:
         st.warning("No penetration data.")
     else:
@@ -516,16 +342,9 @@ elif page == "🛡 Insurance Analysis":
         )
 
     # 5) Insurance type mix
+    pulse_profile.section("Insurance Analysis / 5 insurance type mix")
     st.subheader("5️⃣ Insurance Transaction Type Mix")
-    q5 = f"""
-        SELECT [Transacion_type],
-               SUM(CAST([Transacion_amount] AS BIGINT)) AS amt
-        FROM {TABLES['agg_insu']}
-        WHERE 1=1 {sql_filters()}
-        GROUP BY [Transacion_type]
-        ORDER BY amt DESC;
-    """
-    df5, e5 = run_sql(q5)
+    df5, e5 = pulse_data.insu_type_mix(selected_year, selected_state)
     if e5 or df5 is None or df5.empty:
         st.warning("No type-wise insurance data.")
     else:
@@ -541,16 +360,9 @@ elif page == "🌍 Market Expansion":
     st.title("🌍 Market Expansion Opportunities")
 
     # 1) Highest value states
+    pulse_profile.section("Market Expansion / 1 highest value states")
     st.subheader("1️⃣ Top States by Transaction Amount")
-    q1 = f"""
-        SELECT [State],
-               SUM(CAST([Transacion_amount] AS BIGINT)) AS amt
-        FROM {TABLES['agg_trans']}
-        WHERE 1=1 {sql_filters()}
-        GROUP BY [State]
-        ORDER BY amt DESC;
-    """
-    df1, e1 = run_sql(q1)
+    df1, e1 = pulse_data.tx_top_states(selected_year, selected_state)
     if e1 or df1 is None or df1.empty:
         st.warning("No state-level value data.")
     else:
@@ -560,16 +372,9 @@ elif page == "🌍 Market Expansion":
         )
 
     # 2) Quarter-wise volume trend
+    pulse_profile.section("Market Expansion / 2 quarter-wise volume trend")
     st.subheader("2️⃣ Quarter-wise Transaction Volume")
-    q2 = f"""
-        SELECT [Year], [Quater],
-               SUM(CAST([Transacion_count] AS BIGINT)) AS cnt
-        FROM {TABLES['agg_trans']}
-        WHERE 1=1 {sql_filters()}
-        GROUP BY [Year], [Quater]
-        ORDER BY [Year], [Quater];
-    """
-    df2, e2 = run_sql(q2)
+    df2, e2 = pulse_data.mkt_quarterly_count(selected_year, selected_state)
     if e2 or df2 is None or df2.empty:
         st.warning("No quarter-wise volume data.")
     else:
@@ -580,16 +385,9 @@ elif page == "🌍 Market Expansion":
         )
 
     # 3) Top districts by transactions (map_tran)
+    pulse_profile.section("Market Expansion / 3 top districts by transactions")
     st.subheader("3️⃣ Top Districts by Transactions")
-    q3 = f"""
-        SELECT TOP 30 [Districts],
-               SUM(CAST([Transacion_count] AS BIGINT)) AS cnt
-        FROM {TABLES['map_tran']}
-        WHERE 1=1 {sql_filters()}
-        GROUP BY [Districts]
-        ORDER BY cnt DESC;
-    """
-    df3, e3 = run_sql(q3)
+    df3, e3 = pulse_data.mkt_top_districts(selected_year, selected_state)
     if e3 or df3 is None or df3.empty:
         st.warning("No district-level data from map_tran.")
     else:
@@ -599,16 +397,9 @@ elif page == "🌍 Market Expansion":
         )
 
     # 4) District opportunity map: amount vs count
+    pulse_profile.section("Market Expansion / 4 district opportunity map")
     st.subheader("4️⃣ District Opportunity: Value vs Volume")
-    q4 = f"""
-        SELECT [Districts],
-               SUM(CAST([Transacion_count] AS BIGINT))  AS cnt,
-               SUM(CAST([Transacion_amount] AS BIGINT)) AS amt
-        FROM {TABLES['map_tran']}
-        WHERE 1=1 {sql_filters()}
-        GROUP BY [Districts];
-    """
-    df4, e4 = run_sql(q4)
+    df4, e4 = pulse_data.mkt_district_value_volume(selected_year, selected_state)
     if e4 or df4 is None or df4.empty:
         st.warning("No detailed district metrics.")
     else:
@@ -624,26 +415,9 @@ elif page == "🌍 Market Expansion":
         )
 
     # 5) Top potential states: high growth, medium base
+    pulse_profile.section("Market Expansion / 5 top potential states")
     st.subheader("5️⃣ High-Growth States (YoY Amount)")
-    q5 = f"""
-        WITH yearly AS (
-            SELECT [State], [Year],
-                   SUM(CAST([Transacion_amount] AS BIGINT)) AS amt
-            FROM {TABLES['agg_trans']}
-            GROUP BY [State], [Year]
-        )
-        SELECT a.[State], a.[Year],
-               a.amt AS curr_amt,
-               b.amt AS prev_amt,
-               (a.amt - ISNULL(b.amt,0)) AS delta
-        FROM yearly a
-        LEFT JOIN yearly b
-               ON a.[State] = b.[State]
-              AND a.[Year]  = b.[Year] + 1
-        WHERE 1=1 {"" if selected_year == "All" else f"AND a.Year = {selected_year}"}
-        ORDER BY delta DESC;
-    """
-    df5, e5 = run_sql(q5)
+    df5, e5 = pulse_data.mkt_yoy_amount(selected_year, selected_state)
     if e5 or df5 is None or df5.empty:
         st.warning("No YoY amount data for expansion.")
     else:
@@ -655,150 +429,71 @@ elif page == "🌍 Market Expansion":
 elif page == "🚀 Growth Strategy":
     st.title("🚀 Growth Strategy")
 
-    # load map_user & map_tran raw
-    q_mu = f"SELECT * FROM {TABLES['map_user']} WHERE 1=1 {sql_filters()};"
-    mu, e_mu = run_sql(q_mu)
+    # map_user x map_tran is joined in SQL and streamed (see pulse_data.growth_merged)
+    pulse_profile.section("Growth Strategy / merge")
+    df1, e_gs = pulse_data.gs_district_engagement(selected_year, selected_state)
 
-    q_mt = f"SELECT * FROM {TABLES['map_tran']} WHERE 1=1 {sql_filters()};"
-    mt, e_mt = run_sql(q_mt)
-
-    if e_mu or e_mt or mu is None or mt is None or mu.empty or mt.empty:
+    if e_gs or df1 is None or df1.empty:
         st.error("Could not load map_user / map_tran for growth strategy.")
     else:
-        # detect columns again
-        state_mu = detect_column(mu, ["State"])
-        year_mu = detect_column(mu, ["Year"])
-        qtr_mu = detect_column(mu, ["Quater"])
-        dist_mu = detect_column(mu, ["Districts", "District"])
-        ru_col = detect_column(mu, ["RegisteredUsers", "RegisteredUserst"])
-        opens_col = detect_column(mu, ["AppOpens"])
-
-        state_mt = detect_column(mt, ["State"])
-        year_mt = detect_column(mt, ["Year"])
-        qtr_mt = detect_column(mt, ["Quater"])
-        dist_mt = detect_column(mt, ["Districts", "District"])
-        tx_cnt = detect_column(mt, ["Transacion_count"])
-        tx_amt = detect_column(mt, ["Transacion_amount"])
-
-        if not all(
-            [
-                state_mu,
-                year_mu,
-                qtr_mu,
-                dist_mu,
-                ru_col,
-                opens_col,
-                state_mt,
-                year_mt,
-                qtr_mt,
-                dist_mt,
-                tx_cnt,
-                tx_amt,
-            ]
-        ):
-            st.error("Missing expected columns in map_user / map_tran.")
-        else:
-            # join on State + Year + Quater + Districts
-            key_cols_mu = [state_mu, year_mu, qtr_mu, dist_mu]
-            key_cols_mt = [state_mt, year_mt, qtr_mt, dist_mt]
-
-            merged = pd.merge(
-                mu[key_cols_mu + [ru_col, opens_col]],
-                mt[key_cols_mt + [tx_cnt, tx_amt]],
-                left_on=key_cols_mu,
-                right_on=key_cols_mt,
-                how="inner",
-            )
-
-            merged = merged.rename(
-                columns={
-                    state_mu: "State",
-                    dist_mu: "Districts",
-                    ru_col: "users",
-                    opens_col: "opens",
-                    tx_cnt: "tx_cnt",
-                    tx_amt: "tx_amt",
-                }
-            )
+        # 1) Users vs Opens vs Tx (district level scatter)
+        pulse_profile.section("Growth Strategy / 1 users vs opens vs tx")
+        st.subheader("1️⃣ Users vs Opens vs Tx (Districts)")
+        st.plotly_chart(
+            px.scatter(
+                df1,
+                x="users",
+                y="opens",
+                size="tx_cnt",
+                hover_name="Districts",
+            ),
+            use_container_width=True,
+        )
 
-            # 1) Users vs Opens vs Tx (district level scatter)
-            st.subheader("1️⃣ Users vs Opens vs Tx (Districts)")
-            df1 = (
-                merged.groupby("Districts", as_index=False)[["users", "opens", "tx_cnt"]]
-                .sum()
-                .sort_values("tx_cnt", ascending=False)
-            )
-            st.plotly_chart(
-                px.scatter(
-                    df1,
-                    x="users",
-                    y="opens",
-                    size="tx_cnt",
-                    hover_name="Districts",
-                ),
-                use_container_width=True,
-            )
+        # 2) State-level engagement vs volume
+        pulse_profile.section("Growth Strategy / 2 state-level engagement vs volume")
+        st.subheader("2️⃣ State-level Users vs Transactions")
+        df2, _ = pulse_data.gs_state_users_tx(selected_year, selected_state)
+        st.plotly_chart(
+            px.scatter(
+                df2,
+                x="users",
+                y="tx_cnt",
+                hover_name="State",
+                size="tx_cnt",
+            ),
+            use_container_width=True,
+        )
 
-            # 2) State-level engagement vs volume
-            st.subheader("2️⃣ State-level Users vs Transactions")
-            df2 = (
-                merged.groupby("State", as_index=False)[["users", "tx_cnt"]]
-                .sum()
-                .sort_values("tx_cnt", ascending=False)
-            )
-            st.plotly_chart(
-                px.scatter(
-                    df2,
-                    x="users",
-                    y="tx_cnt",
-                    hover_name="State",
-                    size="tx_cnt",
-                ),
-                use_container_width=True,
-            )
+        # 3) Opens per user vs tx per user (state)
+        pulse_profile.section("Growth Strategy / 3 opens per user vs tx per user")
+        st.subheader("3️⃣ Opens/User vs Tx/User (State)")
+        df3, _ = pulse_data.gs_state_per_user(selected_year, selected_state)
+        st.plotly_chart(
+            px.scatter(
+                df3,
+                x="opens_per_user",
+                y="tx_per_user",
+                hover_name="State",
+                size="users",
+            ),
+            use_container_width=True,
+        )
 
-            # 3) Opens per user vs tx per user (state)
-            st.subheader("3️⃣ Opens/User vs Tx/User (State)")
-            df3 = (
-                merged.groupby("State", as_index=False)[["users", "opens", "tx_cnt"]]
-                .sum()
-            )
-            df3["opens_per_user"] = df3["opens"] / df3["users"]
-            df3["tx_per_user"] = df3["tx_cnt"] / df3["users"]
-            st.plotly_chart(
-                px.scatter(
-                    df3,
-                    x="opens_per_user",
-                    y="tx_per_user",
-                    hover_name="State",
-                    size="users",
-                ),
-                use_container_width=True,
-            )
+        # 4) High-potential districts: many users, low opens
+        pulse_profile.section("Growth Strategy / 4 high-potential districts")
+        st.subheader("4️⃣ High-Potential Districts (Low Opens/User)")
+        df4, _ = pulse_data.gs_low_open_districts(selected_year, selected_state)
+        st.dataframe(df4)
 
-            # 4) High-potential districts: many users, low opens
-            st.subheader("4️⃣ High-Potential Districts (Low Opens/User)")
-            df4 = (
-                merged.groupby("Districts", as_index=False)[["users", "opens"]]
-                .sum()
-                .query("users > 0")
-            )
-            df4["opens_per_user"] = df4["opens"] / df4["users"]
-            df4 = df4.sort_values("opens_per_user").head(25)
-            st.dataframe(df4)
-
-            # 5) High-value districts: high tx_amt
-            st.subheader("5️⃣ High-Value Districts (Tx Amount)")
-            df5 = (
-                merged.groupby("Districts", as_index=False)[["tx_amt"]]
-                .sum()
-                .sort_values("tx_amt", ascending=False)
-                .head(25)
-            )
-            st.plotly_chart(
-                px.bar(df5, x="Districts", y="tx_amt"),
-                use_container_width=True,
-            )
+        # 5) High-value districts: high tx_amt
+        pulse_profile.section("Growth Strategy / 5 high-value districts")
+        st.subheader("5️⃣ High-Value Districts (Tx Amount)")
+        df5, _ = pulse_data.gs_high_value_districts(selected_year, selected_state)
+        st.plotly_chart(
+            px.bar(df5, x="Districts", y="tx_amt"),
+            use_container_width=True,
+        )
 
 # =========================================
 # FOOTER
@@ -806,6 +501,9 @@ elif page == "🚀 Growth Strategy":
 st.sidebar.markdown("---")
 st.sidebar.caption("Database: phonepe @ VASI\\SQLEXPRESS  ·  All pages use 5 query blocks.")
 
+for path in pulse_profile.finish_rerun():
+    st.sidebar.caption(f"Profile written: {path}")
+
 
 
 
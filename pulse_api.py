@@ -0,0 +1,155 @@
+"""Headless JSON / Arrow API over the dashboard's page blocks.
+
+Serves the same numbers as the Streamlit pages without a script rerun or
+Plotly rendering, straight from the query layer in pulse_data.
+
+    python pulse_api.py --port 8600
+
+    GET /api                                         -> pages, blocks, years, states, cache / single-flight stats
+    GET /api/<page>/<block>?year=2022&state=Kerala   -> block result as JSON
+    GET /api/<page>/<block>?format=arrow             -> Arrow IPC stream
+
+Responses carry an ETag built from the data version and the request, so a
+client sending If-None-Match gets a 304 without any query being run.
+"""
+import io
+import json
+import hashlib
+import argparse
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pyarrow as pa
+
+import pulse_data
+
+ARROW_MIME = "application/vnd.apache.arrow.stream"
+
+
+def make_etag(version, *parts):
+    raw = "|".join([version] + [str(p) for p in parts])
+    return '"' + hashlib.sha1(raw.encode()).hexdigest()[:20] + '"'
+
+
+def etag_matches(header, etag):
+    """True if an If-None-Match header value covers etag (weak or strong)."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [t.strip() for t in header.split(",")]
+    return etag in tags or f"W/{etag}" in tags
+
+
+def to_arrow(df):
+    sink = io.BytesIO()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+class PulseHandler(BaseHTTPRequestHandler):
+    server_version = "PulseAPI/1.0"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        if parts == ["api"]:
+            return self.send_index()
+        if len(parts) == 3 and parts[0] == "api":
+            return self.send_block(parts[1], parts[2], query)
+        self.send_json(HTTPStatus.NOT_FOUND, {"error": f"unknown path {url.path}"})
+
+    def send_index(self):
+        self.send_json(
+            HTTPStatus.OK,
+            {
+                "pages": {page: list(blocks) for page, blocks in pulse_data.PAGES.items()},
+                "years": pulse_data.available_years(),
+                "states": pulse_data.available_states(),
+                "data_version": pulse_data.data_version(),
+                "cache": pulse_data.cache_stats(),
+                "single_flight": pulse_data.flight_stats(),
+            },
+        )
+
+    def send_block(self, page, block, query):
+        fn = pulse_data.PAGES.get(page, {}).get(block)
+        if fn is None:
+            return self.send_json(HTTPStatus.NOT_FOUND, {"error": f"unknown block {page}/{block}"})
+
+        year = query.get("year", "All")
+        state = query.get("state", "All")
+        fmt = query.get("format", "json")
+        # filters are interpolated into SQL, so only values the sidebar offers are allowed
+        if year != "All" and year not in pulse_data.available_years():
+            return self.send_json(HTTPStatus.BAD_REQUEST, {"error": f"unknown year {year!r}"})
+        if state != "All" and state not in pulse_data.available_states():
+            return self.send_json(HTTPStatus.BAD_REQUEST, {"error": f"unknown state {state!r}"})
+        if fmt not in ("json", "arrow"):
+            return self.send_json(HTTPStatus.BAD_REQUEST, {"error": f"unknown format {fmt!r}"})
+
+        version = pulse_data.data_version()
+        etag = make_etag(version, page, block, year, state, fmt) if version else None
+        if etag and etag_matches(self.headers.get("If-None-Match"), etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        df, err = fn(year, state)
+        if err or df is None:
+            return self.send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(err)})
+
+        if fmt == "arrow":
+            return self.send_body(HTTPStatus.OK, to_arrow(df), ARROW_MIME, etag)
+        self.send_json(
+            HTTPStatus.OK,
+            {
+                "page": page,
+                "block": block,
+                "year": year,
+                "state": state,
+                "data_version": version,
+                "rows": json.loads(df.to_json(orient="records")),
+            },
+            etag,
+        )
+
+    def send_json(self, status, payload, etag=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_body(status, body, "application/json", etag)
+
+    def send_body(self, status, body, content_type, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PhonePe Pulse JSON / Arrow API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), PulseHandler)
+    print(f"Serving PhonePe Pulse API on http://{args.host}:{args.port}/api")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1250 @@
+"""Query layer shared by the Streamlit dashboard (phonepe.py) and the JSON API (pulse_api.py).
+
+Each numbered block on a dashboard page is a function here that takes the
+sidebar filters (year, state) and returns (df, error_or_None).
+"""
+import os
+import copy
+import time
+import shutil
+import urllib
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as pads
+import pyarrow.fs as pafs
+import streamlit as st
+from sqlalchemy import create_engine, text
+
+# =========================================
+# DB CONNECTION
+# =========================================
+odbc_str = (
+    "DRIVER={ODBC Driver 17 for SQL Server};"
+    r"SERVER=VASI\SQLEXPRESS;"
+    "DATABASE=phonepe;"
+    "Trusted_Connection=yes;"
+)
+params = urllib.parse.quote_plus(odbc_str)
+# created on first use, so importing this module (the Parquet backend, tests)
+# does not need the ODBC driver; assign it to point the queries elsewhere
+engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global engine
+    with _engine_lock:
+        if engine is None:
+            engine = create_engine(
+                f"mssql+pyodbc:///?odbc_connect={params}",
+                fast_executemany=True,
+            )
+        return engine
+
+# =========================================
+# TABLE MAP
+# =========================================
+TABLES = {
+    "agg_trans": "Agg_trans",
+    "agg_insu": "Agg_insu",
+    "map_user": "map_user",
+    "map_tran": "map_tran",
+    "top_tran": "top_tran",
+}
+
+# =========================================
+# PARQUET BACKEND
+# =========================================
+# Point PHONEPE_PARQUET_DIR at a pulse_parquet export to run the dashboard off
+# a plain directory instead of SQL Server. Year filters prune Year=
+# partitions, State filters skip row groups by their min/max statistics, and
+# only the projected columns are read, through memory-mapped files.
+PARQUET_DIR = os.environ.get("PHONEPE_PARQUET_DIR", "")
+# typed like the SQL columns, so results carry the same dtypes on both backends
+PARTITIONING = pads.partitioning(
+    pa.schema([("Year", pa.int64()), ("Quater", pa.int64())]), flavor="hive"
+)
+
+
+def _parquet_dataset(name):
+    return pads.dataset(
+        os.path.join(PARQUET_DIR, f"dataset={name}"),
+        format="parquet",
+        partitioning=PARTITIONING,
+        filesystem=pafs.LocalFileSystem(use_mmap=True),
+    )
+
+
+def _parquet_filter(year="All", state="All", quarter=None):
+    conds = []
+    if year != "All":
+        conds.append(pads.field("Year") == int(year))
+    if quarter is not None:
+        conds.append(pads.field("Quater") == int(quarter))
+    if state != "All":
+        conds.append(pads.field("State") == state)
+    flt = None
+    for c in conds:
+        flt = c if flt is None else flt & c
+    return flt
+
+
+def parquet_columns(name):
+    """Like SELECT TOP 0: (empty frame with the dataset's columns, error_or_None)."""
+    try:
+        return pd.DataFrame(columns=_parquet_dataset(name).schema.names), None
+    except Exception as e:
+        return None, e
+
+
+def read_parquet(name, columns, year="All", state="All", quarter=None):
+    """Read only columns of the rows matching the filters from dataset name."""
+    return (
+        _parquet_dataset(name)
+        .to_table(columns=list(columns), filter=_parquet_filter(year, state, quarter))
+        .to_pandas()
+    )
+
+
+def iter_parquet(name, columns, year="All", state="All"):
+    """Yield the filtered rows of dataset name as DataFrames of up to STREAM_CHUNKSIZE rows."""
+    batches = _parquet_dataset(name).to_batches(
+        columns=list(columns),
+        filter=_parquet_filter(year, state),
+        batch_size=STREAM_CHUNKSIZE,
+    )
+    for batch in batches:
+        yield batch.to_pandas()
+
+
+@st.cache_data(ttl=300)
+def parquet_distinct(name, column):
+    """Sorted distinct values of column in dataset name, as strings."""
+    return sorted(read_parquet(name, [column])[column].astype(str).unique().tolist())
+
+
+def parquet_partitions(name, year="All"):
+    """Sorted (Year, Quater) partitions of dataset name, from the directory names only."""
+    keys = set()
+    for fragment in _parquet_dataset(name).get_fragments(filter=_parquet_filter(year)):
+        part = pads.get_partition_keys(fragment.partition_expression)
+        keys.add((part["Year"], part["Quater"]))
+    return sorted(keys)
+
+
+# =========================================
+# SHARED DISK CACHE
+# =========================================
+# Results are pickled under CACHE_DIR/<data_version>/ so every process
+# (dashboard sessions, pulse_api, pulse_warm) shares them, and a new load
+# starts a fresh directory. Set PHONEPE_CACHE_DIR="" to disable.
+CACHE_DIR = os.environ.get(
+    "PHONEPE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".pulse_cache"),
+)
+# The version does not see in-place UPDATEs that keep row counts and skip the
+# load stamp, so entries are also recomputed once they are this old (0: never).
+CACHE_MAX_AGE = float(os.environ.get("PHONEPE_CACHE_MAX_AGE", "3600"))
+
+
+# one row is appended per load by the ETL notebook, so a reload changes the
+# version even when every table ends up with the same row count
+LOAD_STAMP_TABLE = "pulse_load"
+
+# seconds before an unreadable version is asked for again
+VERSION_RETRY = 30
+
+_pinned_version = None
+_version_failed_at = None
+
+
+def pin_data_version(version):
+    """Use version instead of reading it (pulse_warm workers get the parent's)."""
+    global _pinned_version
+    _pinned_version = version
+
+
+def data_version():
+    """Fingerprint of the loaded data; None if unreadable.
+
+    Built from catalog metadata only (object id, modify date, row count of
+    the tables and the load stamp), so it never scans a table and needs no
+    permission beyond seeing the tables. With the Parquet backend it
+    fingerprints the files (path, size, mtime). A failed read is retried
+    after VERSION_RETRY seconds rather than remembered for the ttl.
+    """
+    global _version_failed_at
+    if _pinned_version is not None:
+        return _pinned_version
+    if _version_failed_at is not None and time.monotonic() - _version_failed_at < VERSION_RETRY:
+        return None
+    try:
+        version = _read_data_version()  # raises instead of returning None, st.cache_data skips it
+    except Exception:
+        _version_failed_at = time.monotonic()
+        return None
+    _version_failed_at = None
+    return version
+
+
+@st.cache_data(ttl=300)
+def _read_data_version():
+    if PARQUET_DIR:
+        return _parquet_version()
+    names = ", ".join(f"'{t}'" for t in sorted(TABLES.values()) + [LOAD_STAMP_TABLE])
+    df = pd.read_sql(
+        text(f"""
+            SELECT o.name, o.object_id, o.modify_date, SUM(p.rows) AS n
+            FROM sys.objects o
+            JOIN sys.partitions p
+              ON p.object_id = o.object_id AND p.index_id IN (0, 1)
+            WHERE o.type = 'U' AND o.name IN ({names})
+            GROUP BY o.name, o.object_id, o.modify_date
+            ORDER BY o.name;
+        """),
+        get_engine(),
+    )
+    if df.empty:
+        raise LookupError("none of the Pulse tables is visible")
+    parts = [f"{r.name}:{r.object_id}:{r.modify_date}:{r.n}" for r in df.itertuples()]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+def _parquet_version():
+    parts = []
+    for root, dirs, files in os.walk(PARQUET_DIR):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            parts.append(f"{os.path.relpath(path, PARQUET_DIR)}:{stat.st_size}:{stat.st_mtime_ns}")
+    if not parts:
+        raise FileNotFoundError(f"no Parquet files under {PARQUET_DIR!r}")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+def _cache_file(key):
+    version = data_version() if CACHE_DIR else None
+    if version is None:
+        return None
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()
+    return os.path.join(CACHE_DIR, version, digest + ".pkl")
+
+
+def cache_get(*key):
+    """Return the value cached on disk for key under the current data version, or None.
+
+    Entries older than CACHE_MAX_AGE seconds count as missing.
+    """
+    path = _cache_file(key)
+    if path is None:
+        return None
+    try:
+        if CACHE_MAX_AGE and time.time() - os.path.getmtime(path) > CACHE_MAX_AGE:
+            return None
+        return pd.read_pickle(path)
+    except Exception:
+        return None
+
+
+def cache_put(value, *key):
+    path = _cache_file(key)
+    if path is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        pd.to_pickle(value, tmp)
+        os.replace(tmp, path)  # atomic, readers never see a partial file
+    except OSError:
+        pass
+
+
+def prune_cache(keep=None):
+    """Delete cache directories of data versions other than keep (default: current)."""
+    keep = keep or data_version()
+    if not CACHE_DIR or not os.path.isdir(CACHE_DIR):
+        return []
+    removed = []
+    for name in os.listdir(CACHE_DIR):
+        if name != keep:
+            shutil.rmtree(os.path.join(CACHE_DIR, name), ignore_errors=True)
+            removed.append(name)
+    return removed
+
+
+# =========================================
+# SINGLE-FLIGHT
+# =========================================
+# When the ttl expires, or right after a deploy or a load, the dashboard
+# sessions, pulse_api and pulse_warm all miss at once and ask for the same
+# results. Inside one process st.cache_data already serializes identical
+# calls, so shared() coalesces across processes: the first one to miss takes
+# a lock file next to the disk-cache entry, computes and writes it, and the
+# others wait for the entry. The leader writes an owner token into the lock
+# and refreshes its mtime while it works, so a slow query is never mistaken
+# for a dead one; a lock left unrefreshed for SINGLE_FLIGHT_WAIT seconds is
+# broken and the waiter computes the entry itself. single_flight() coalesces the
+# threads of one process in front of it, for callers st.cache_data does not
+# cover (agg_query, the same SQL spelled with different whitespace).
+SINGLE_FLIGHT_WAIT = float(os.environ.get("PHONEPE_SINGLE_FLIGHT_WAIT", "30"))
+LOCK_POLL = 0.05
+
+_inflight = {}  # normalized key -> _Flight
+_inflight_lock = threading.Lock()
+# executions: fn() ran in this process
+# duplicates_avoided: a thread of this process reused another thread's result
+# shared_hits: the result was computed by another process while we waited
+# wait_timeouts / leader_errors: a waiter gave up on, or lost, its leader
+FLIGHT_STATS = Counter()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+def _count(name):
+    with _inflight_lock:
+        FLIGHT_STATS[name] += 1
+
+
+def normalize_sql(sql: str):
+    return " ".join(sql.split())
+
+
+def flight_stats():
+    """Single-flight counters for this process, plus how many queries are in flight now."""
+    names = ("executions", "duplicates_avoided", "shared_hits", "wait_timeouts", "leader_errors")
+    with _inflight_lock:
+        stats = {k: FLIGHT_STATS[k] for k in names}
+        stats["in_flight"] = len(_inflight)
+    return stats
+
+
+def single_flight(key, fn):
+    """Call fn() once for all concurrent callers with the same key and share its result.
+
+    Return (result, coalesced): coalesced is True when the result came from
+    another caller's fn(). Waiting callers get a deep copy, so nobody mutates
+    another session's frame.
+    """
+    with _inflight_lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = _Flight()
+
+    if not leader:
+        if flight.done.wait(SINGLE_FLIGHT_WAIT):
+            if not flight.failed:
+                _count("duplicates_avoided")
+                return copy.deepcopy(flight.result), True
+            _count("leader_errors")
+        else:
+            _count("wait_timeouts")
+        return fn(), False
+
+    try:
+        flight.result = fn()
+        return flight.result, False
+    except BaseException:
+        flight.failed = True
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        flight.done.set()
+
+
+def shared(key, fn):
+    """Return the disk-cached value for key, computing it with fn() at most once
+    across the threads and processes that miss together."""
+    return shared_with_origin(key, fn)[0]
+
+
+def shared_with_origin(key, fn):
+    """shared(), returning (value, origin); origin is "disk" (read from the
+    cache), "computed" (fn() ran here) or "coalesced" (another thread or
+    process computed it while we waited)."""
+    value = cache_get(*key)
+    if value is not None:
+        return value, "disk"
+    (value, origin), coalesced = single_flight(key, lambda: _compute_once(key, fn))
+    return value, "coalesced" if coalesced else origin
+
+
+def _compute_once(key, fn):
+    path = _cache_file(key)
+    if path is None:  # no disk cache, nothing to share between processes
+        _count("executions")
+        return fn(), "computed"
+    lock = path + ".lock"
+    token = f"{os.getpid()}:{threading.get_ident()}:{os.urandom(8).hex()}"
+    while True:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with os.fdopen(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY), "w") as f:
+                f.write(token)
+            break
+        except FileExistsError:
+            value = _wait_for(key, lock)
+            if value is not None:
+                return value, "coalesced"
+        except OSError:  # cannot lock (read-only cache dir...), just compute
+            _count("executions")
+            return fn(), "computed"
+    stop = threading.Event()
+    heartbeat = threading.Thread(
+        target=_keep_alive, args=(lock, token, stop), name="pulse-lock-heartbeat", daemon=True
+    )
+    heartbeat.start()
+    try:
+        value = cache_get(*key)  # written between our miss and taking the lock
+        if value is not None:
+            return value, "disk"
+        _count("executions")
+        value = fn()
+        cache_put(value, *key)
+        return value, "computed"
+    finally:
+        stop.set()
+        heartbeat.join()
+        _release(lock, token)
+
+
+def _lock_owner(lock):
+    try:
+        with open(lock, encoding="ascii") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _release(lock, token):
+    """Remove lock only while it still holds token; it may have been broken and retaken."""
+    if _lock_owner(lock) == token:
+        try:
+            os.remove(lock)
+        except OSError:
+            pass
+
+
+def _keep_alive(lock, token, stop):
+    """Touch lock every third of SINGLE_FLIGHT_WAIT while its owner computes."""
+    while not stop.wait(SINGLE_FLIGHT_WAIT / 3):
+        if _lock_owner(lock) != token:
+            return
+        try:
+            os.utime(lock)
+        except OSError:
+            return
+
+
+def _wait_for(key, lock):
+    """Wait while another process holds lock; its cached value, or None to take over."""
+    while True:
+        owner = _lock_owner(lock)
+        try:
+            age = time.time() - os.path.getmtime(lock)
+        except FileNotFoundError:  # the leader is done
+            value = cache_get(*key)
+            _count("shared_hits" if value is not None else "leader_errors")
+            return value
+        if age > SINGLE_FLIGHT_WAIT:  # nobody refreshed it: the leader died
+            _count("wait_timeouts")
+            _release(lock, owner)
+            return None
+        time.sleep(LOCK_POLL)
+
+
+# =========================================
+# HELPERS
+# =========================================
+@st.cache_data(ttl=300)
+def run_sql(sql: str):
+    """Run SQL and return (df, error_or_None), through the shared disk cache."""
+    try:
+        return shared(("sql", normalize_sql(sql)), lambda: pd.read_sql(text(sql), get_engine())), None
+    except Exception as e:
+        return None, e
+
+
+# rows fetched per round-trip when streaming large tables
+STREAM_CHUNKSIZE = int(os.environ.get("PHONEPE_STREAM_CHUNKSIZE", "50000"))
+
+
+def _fold(acc, part, keys, cols):
+    """Merge a chunk's partial aggregate into the running one (sum/count both add)."""
+    if acc is None:
+        return part
+    return (
+        pd.concat([acc, part], ignore_index=True)
+        .groupby(keys, as_index=False)[cols]
+        .sum()
+    )
+
+
+def _aggregate_chunks(chunks, aggregates):
+    acc = {name: None for name in aggregates}
+    for chunk in chunks:
+        for name, (keys, aggs) in aggregates.items():
+            keys, aggs = list(keys), dict(aggs)
+            part = chunk.groupby(keys, as_index=False).agg(aggs)
+            acc[name] = _fold(acc[name], part, keys, list(aggs))
+        del chunk
+    out = {}
+    for name, (keys, aggs) in aggregates.items():
+        if acc[name] is None:
+            acc[name] = pd.DataFrame(columns=list(keys) + list(dict(aggs)))
+        out[name] = acc[name]
+    return out
+
+
+def _stream_aggregate(sql, aggregates, chunksize):
+    # mssql+pyodbc has no server-side cursors; memory stays bounded because
+    # read_sql pulls chunks with fetchmany() and the driver reads the default
+    # (firehose) result set off the wire lazily
+    with get_engine().connect() as conn:
+        return _aggregate_chunks(pd.read_sql(text(sql), conn, chunksize=chunksize), aggregates)
+
+
+@st.cache_data(ttl=300)
+def run_sql_stream(sql: str, aggregates: dict, chunksize: int = STREAM_CHUNKSIZE):
+    """Read SQL in chunks of chunksize rows (cursor.fetchmany), aggregating chunk by chunk.
+
+    aggregates maps a result name to (group_cols, ((col, "sum" | "count"), ...)).
+    Only one chunk plus the running groups is held in memory at a time. This
+    relies on the driver fetching lazily, not on a server-side cursor, which
+    mssql+pyodbc does not support.
+    Return ({name: df}, error_or_None).
+    """
+    try:
+        key = ("stream", normalize_sql(sql), repr(aggregates))
+        return shared(key, lambda: _stream_aggregate(sql, aggregates, chunksize)), None
+    except Exception as e:
+        return None, e
+
+
+@st.cache_data(ttl=300)
+def parquet_stream(name: str, columns: tuple, year: str, state: str, aggregates: dict):
+    """run_sql_stream over a Parquet dataset: fold its filtered record batches.
+
+    Goes through the shared disk cache like run_sql_stream.
+    Return ({name: df}, error_or_None).
+    """
+    try:
+        key = ("parquet_stream", name, columns, year, state, repr(aggregates))
+        return shared(key, lambda: _aggregate_chunks(iter_parquet(name, columns, year, state), aggregates)), None
+    except Exception as e:
+        return None, e
+
+
+def detect_column(df: pd.DataFrame, candidates):
+    """Pick first existing column name from candidate list."""
+    for c in candidates:
+        if c in df.columns:
+            return c
+    return None
+
+
+# =========================================
+# FILTERS
+# =========================================
+def available_years():
+    if PARQUET_DIR:
+        return sorted({str(y) for y, _ in parquet_partitions("agg_trans")})
+    df, _ = run_sql(f"SELECT DISTINCT [Year] FROM {TABLES['agg_trans']} ORDER BY [Year];")
+    return sorted(df["Year"].astype(str).tolist()) if df is not None else []
+
+
+def available_states():
+    if PARQUET_DIR:
+        return parquet_distinct("agg_trans", "State")
+    df, _ = run_sql(f"SELECT DISTINCT [State] FROM {TABLES['agg_trans']} ORDER BY [State];")
+    return sorted(df["State"].astype(str).tolist()) if df is not None else []
+
+
+def sql_filters(year="All", state="All"):
+    conds = []
+    if year != "All":
+        conds.append(f"[Year] = '{year}'")
+    if state != "All":
+        conds.append(f"[State] = '{state}'")
+    return (" AND " + " AND ".join(conds)) if conds else ""
+
+
+# =========================================
+# AGGREGATE QUERIES (with subsumption)
+# =========================================
+# Recent SUM ... GROUP BY results, kept so a narrower query can be answered
+# locally: a result grouped by State for "All" states answers any single
+# state, one grouped by Year answers any single year, and so on. Every answer,
+# subsumed or queried, is also written to the shared disk cache under its own
+# key, so what pulse_warm derives is a hit for any later process.
+RESULT_TTL = 300
+RESULT_SLOTS = 512
+FILTER_COLS = {"year": "Year", "state": "State"}
+
+_results = OrderedDict()  # (table, group_by, measures, year, state, top, order_by) -> (version, stored_at, df)
+_results_lock = threading.Lock()
+# exact_hits: same query answered in this process; disk_hits: read from the
+# shared disk cache; coalesced_hits: computed by another thread or process
+# while we waited; subsumed_hits: derived from a broader result; misses: queried
+CACHE_STATS = Counter()
+
+
+HIT_KINDS = ("exact_hits", "disk_hits", "coalesced_hits", "subsumed_hits")
+
+
+def _tally(name):
+    with _results_lock:
+        CACHE_STATS[name] += 1
+
+
+def cache_stats():
+    """Counts and hit rates of agg_query lookups in this process."""
+    with _results_lock:
+        stats = {k: CACHE_STATS[k] for k in HIT_KINDS + ("misses",)}
+    total = sum(stats.values())
+    for k in HIT_KINDS:
+        stats[k.replace("_hits", "_hit_rate")] = stats[k] / total if total else 0.0
+    return stats
+
+
+def _agg_sql(table, group_by, measures, year, state, order_by, top):
+    cols = [f"[{c}]" for c in group_by]
+    cols += [f"SUM(CAST([{col}] AS BIGINT)) AS {alias}" for alias, col in measures]
+    sql = f"SELECT {f'TOP {top} ' if top else ''}{', '.join(cols)} "
+    sql += f"FROM {TABLES[table]} WHERE 1=1 {sql_filters(year, state)}"
+    if group_by:
+        sql += " GROUP BY " + ", ".join(f"[{c}]" for c in group_by)
+    if order_by:
+        sql += " ORDER BY " + ", ".join(
+            (f"[{c}]" if c in group_by else c) + (" DESC" if desc else "")
+            for c, desc in order_by
+        )
+    return sql + ";"
+
+
+def _subsumes(cached, wanted):
+    """True if the cached result (no TOP) holds every group and measure wanted needs."""
+    c_table, c_group, c_measures, c_year, c_state, c_top, _ = cached
+    table, group_by, measures, year, state, _, _ = wanted
+    if c_top or c_table != table:
+        return False
+    if not {col for _, col in measures} <= {col for _, col in c_measures}:
+        return False
+    needed = set(group_by)
+    for dim, (c_value, value) in {"year": (c_year, year), "state": (c_state, state)}.items():
+        if c_value == value:
+            continue
+        if c_value != "All":  # cached result is already filtered to another value
+            return False
+        needed.add(FILTER_COLS[dim])  # filter it locally, so it must be a group column
+    return needed <= set(c_group)
+
+
+def _answer_from(cached, df, wanted):
+    """Filter and re-aggregate a broader cached result to answer wanted (sums add up)."""
+    _, _, c_measures, c_year, c_state, _, _ = cached
+    _, group_by, measures, year, state, top, order_by = wanted
+    mask = np.ones(len(df), dtype=bool)
+    if year != c_year:
+        mask &= (df["Year"].astype(str) == str(year)).to_numpy()
+    if state != c_state:
+        mask &= (df["State"] == state).to_numpy()
+    alias_of = {col: alias for alias, col in c_measures}
+    src = [alias_of[col] for _, col in measures]
+    part = df.loc[mask, list(group_by) + src]
+    if group_by:
+        out = part.groupby(list(group_by), as_index=False)[src].sum()
+    else:
+        # one row, summed column by column so integer sums stay integers
+        out = pd.DataFrame([[part.iloc[:, i].sum() for i in range(len(src))]])
+    out.columns = list(group_by) + [alias for alias, _ in measures]
+    if order_by:
+        out = out.sort_values(
+            [c for c, _ in order_by], ascending=[not desc for _, desc in order_by]
+        )
+    if top:
+        out = out.head(top)
+    return out.reset_index(drop=True)
+
+
+def _parquet_agg(key):
+    """agg_query on the Parquet backend: read the filtered columns and group locally."""
+    table, group_by, measures, year, state, _, _ = key
+    cols = list(dict.fromkeys(list(group_by) + [col for _, col in measures]))
+    rows = read_parquet(table, cols, year, state)
+    # like SUM(CAST(col AS BIGINT)): truncate every row before adding (NULLs add nothing)
+    measured = list(dict.fromkeys(col for _, col in measures))
+    rows[measured] = rows[measured].fillna(0).astype("int64")
+    # the raw rows act as an already filtered result with one measure per column
+    rows_key = (table, tuple(cols), tuple((col, col) for _, col in measures), year, state, None, ())
+    return _answer_from(rows_key, rows, key)
+
+
+def agg_query(table, group_by, measures, year="All", state="All", order_by=(), top=None):
+    """SELECT group_by, SUM(CAST(column AS BIGINT)) per (alias, column) in measures.
+
+    Answered, in order, from an identical recent result in this process, from
+    the shared disk cache, from a broader recent result (see _subsumes), or by
+    SQL (a Parquet scan when PHONEPE_PARQUET_DIR is set). Return (df, error_or_None).
+    """
+    key = (table, tuple(group_by), tuple(measures), year, state, top, tuple(order_by))
+    version, now = data_version(), time.monotonic()
+    with _results_lock:
+        live = [
+            (k, df) for k, (v, stored_at, df) in _results.items()
+            if v == version and now - stored_at < RESULT_TTL
+        ]
+    for k, df in live:
+        if k == key:
+            _tally("exact_hits")
+            return df.copy(), None
+
+    origin = []
+
+    def compute():
+        # smallest broader result first, it is the cheapest to re-aggregate
+        for k, df in sorted(live, key=lambda kv: len(kv[1])):
+            if _subsumes(k, key):
+                origin.append("subsumed_hits")
+                return _answer_from(k, df, key)
+        origin.append("misses")
+        if PARQUET_DIR:
+            return _parquet_agg(key)
+        return pd.read_sql(text(_agg_sql(table, group_by, measures, year, state, order_by, top)), get_engine())
+
+    try:
+        df, how = shared_with_origin(("agg",) + key, compute)
+    except Exception as e:
+        return None, e
+    _tally(origin[0] if how == "computed" else f"{how}_hits")
+    with _results_lock:
+        _results[key] = (version, now, df)
+        _results.move_to_end(key)
+        while len(_results) > RESULT_SLOTS:
+            _results.popitem(last=False)
+    return df.copy(), None
+
+
+# =========================================
+# 🏠 HOME
+# =========================================
+def home_kpi(year="All", state="All"):
+    return agg_query(
+        "agg_trans", (),
+        (("total_tx", "Transacion_count"), ("total_amt", "Transacion_amount")),
+        year, state,
+    )
+
+
+def home_state_totals(year="All", state="All"):
+    return agg_query(
+        "agg_trans", ("State",),
+        (("total_amount", "Transacion_amount"), ("total_count", "Transacion_count")),
+        year, state, order_by=(("total_amount", True),),
+    )
+
+
+# =========================================
+# 📈 TRANSACTION DYNAMICS
+# =========================================
+def tx_top_states(year="All", state="All"):
+    return agg_query(
+        "agg_trans", ("State",), (("amt", "Transacion_amount"),),
+        year, state, order_by=(("amt", True),),
+    )
+
+
+def tx_quarterly_amount(year="All", state="All"):
+    return agg_query(
+        "agg_trans", ("Year", "Quater"), (("amt", "Transacion_amount"),),
+        year, state, order_by=(("Year", False), ("Quater", False)),
+    )
+
+
+def tx_type_split(year="All", state="All"):
+    return agg_query(
+        "agg_trans", ("Transacion_type",), (("amt", "Transacion_amount"),),
+        year, state, order_by=(("amt", True),),
+    )
+
+
+def tx_state_type_counts(year="All", state="All"):
+    return agg_query(
+        "agg_trans", ("State", "Transacion_type"), (("cnt", "Transacion_count"),),
+        year, state,
+    )
+
+
+def _parquet_yoy(column, alias, year="All", state="All"):
+    """The yearly self-join of tx_yoy_count / mkt_yoy_amount, done in pandas."""
+    yearly, err = agg_query("agg_trans", ("State", "Year"), ((alias, column),))
+    if err:
+        return None, err
+    prev = yearly.assign(Year=yearly["Year"] + 1)
+    df = yearly.merge(prev, on=["State", "Year"], how="left", suffixes=("", "_prev"))
+    if year != "All":
+        df = df[df["Year"] == int(year)]
+    if state != "All":
+        df = df[df["State"] == state]
+    prev = df[f"{alias}_prev"]
+    if not prev.isna().any():  # like SQL, integers unless some year has no previous one
+        prev = prev.astype(df[alias].dtype)
+    df = pd.DataFrame({
+        "State": df["State"],
+        "Year": df["Year"],
+        f"curr_{alias}": df[alias],
+        f"prev_{alias}": prev,
+        "delta": (df[alias] - df[f"{alias}_prev"].fillna(0)).astype(df[alias].dtype),
+    })
+    return df.sort_values("delta", ascending=False).reset_index(drop=True), None
+
+
+def tx_yoy_count(year="All", state="All"):
+    # growth needs every year, so only the state filter applies
+    if PARQUET_DIR:
+        return _parquet_yoy("Transacion_count", "cnt", state=state)
+    return run_sql(f"""
+        WITH yearly AS (
+            SELECT [State], [Year],
+                   SUM(CAST([Transacion_count] AS BIGINT)) AS cnt
+            FROM {TABLES['agg_trans']}
+            GROUP BY [State], [Year]
+        )
+        SELECT a.[State], a.[Year],
+               a.cnt AS curr_cnt,
+               b.cnt AS prev_cnt,
+               (a.cnt - ISNULL(b.cnt,0)) AS delta
+        FROM yearly a
+        LEFT JOIN yearly b
+               ON a.[State] = b.[State]
+              AND a.[Year]  = b.[Year] + 1
+        WHERE 1=1 {"" if state == "All" else f"AND a.State = '{state}'"}
+        ORDER BY delta DESC;
+    """)
+
+
+# =========================================
+# 👥 USER ENGAGEMENT (map_user)
+# =========================================
+def user_engagement(year="All", state="All"):
+    """Stream map_user into per-state (users, opens) and per-district (users) totals.
+
+    Return ({"state": df, "district": df_or_None}, error_or_None); "district"
+    is None when map_user has no district column.
+    """
+    # Read the header only (TOP 0), to detect column names without loading rows
+    if PARQUET_DIR:
+        cols_mu, err = parquet_columns("map_user")
+    else:
+        cols_mu, err = run_sql(f"SELECT TOP 0 * FROM {TABLES['map_user']};")
+    if err or cols_mu is None:
+        return None, err
+
+    # Utility: detect correct column names
+    state_col = detect_column(cols_mu, ["State", "state"])
+    district_col = detect_column(cols_mu, ["Districts", "District", "districts"])
+    ru_col = detect_column(cols_mu, ["RegisteredUsers", "RegisteredUserst", "registeredusers"])
+    opens_col = detect_column(cols_mu, ["AppOpens", "appopens"])
+    if not all([state_col, ru_col, opens_col]):
+        return None, KeyError("map_user is missing State / RegisteredUsers / AppOpens")
+
+    # Stream map_user and aggregate per chunk; only the groups stay in memory
+    read_cols = [state_col, ru_col, opens_col] + ([district_col] if district_col else [])
+    q_mu = (
+        f"SELECT {', '.join(f'[{c}]' for c in read_cols)} "
+        f"FROM {TABLES['map_user']} WHERE 1=1 {sql_filters(year, state)};"
+    )
+    aggregates = {"state": ((state_col,), ((ru_col, "sum"), (opens_col, "sum")))}
+    if district_col:
+        aggregates["district"] = ((district_col,), ((ru_col, "sum"),))
+    if PARQUET_DIR:
+        agg, err = parquet_stream("map_user", tuple(read_cols), year, state, aggregates)
+    else:
+        agg, err = run_sql_stream(q_mu, aggregates)
+    if err or agg is None:
+        return None, err
+
+    by_district = None
+    if district_col:
+        by_district = agg["district"].rename(
+            columns={district_col: "Districts", ru_col: "users"}
+        )
+    return {
+        "state": agg["state"].rename(
+            columns={state_col: "State", ru_col: "users", opens_col: "opens"}
+        ),
+        "district": by_district,
+    }, None
+
+
+def ue_users_by_state(year="All", state="All"):
+    agg, err = user_engagement(year, state)
+    if err:
+        return None, err
+    return agg["state"][["State", "users"]].sort_values("users", ascending=False), None
+
+
+def ue_opens_by_state(year="All", state="All"):
+    agg, err = user_engagement(year, state)
+    if err:
+        return None, err
+    return agg["state"][["State", "opens"]].sort_values("opens", ascending=False), None
+
+
+def ue_opens_per_user(year="All", state="All"):
+    agg, err = user_engagement(year, state)
+    if err:
+        return None, err
+    df = agg["state"][["State", "users", "opens"]].copy()
+    df["opens_per_user"] = (df["opens"] / df["users"]).replace([np.inf, -np.inf], 0)
+    # the page has always listed states by users, largest first
+    return df.sort_values("users", ascending=False), None
+
+
+def ue_top_districts(year="All", state="All"):
+    agg, err = user_engagement(year, state)
+    if err:
+        return None, err
+    if agg["district"] is None:
+        return None, KeyError("map_user has no Districts column")
+    return agg["district"].sort_values("users", ascending=False), None
+
+
+# =========================================
+# 🛡 INSURANCE ANALYSIS (agg_insu)
+# =========================================
+def insu_count_by_state(year="All", state="All"):
+    return agg_query(
+        "agg_insu", ("State",), (("cnt", "Transacion_count"),),
+        year, state, order_by=(("cnt", True),),
+    )
+
+
+def insu_amount_by_state(year="All", state="All"):
+    return agg_query(
+        "agg_insu", ("State",), (("amt", "Transacion_amount"),),
+        year, state, order_by=(("amt", True),),
+    )
+
+
+def insu_yearly_amount(year="All", state="All"):
+    return agg_query(
+        "agg_insu", ("Year",), (("amt", "Transacion_amount"),),
+        year, state, order_by=(("Year", False),),
+    )
+
+
+def insu_penetration(year="All", state="All"):
+    if PARQUET_DIR:
+        insu, err = agg_query("agg_insu", ("State",), (("insu_cnt", "Transacion_count"),), year, state)
+        if err:
+            return None, err
+        all_tx, err = agg_query("agg_trans", ("State",), (("all_cnt", "Transacion_count"),), year, state)
+        if err:
+            return None, err
+        df = insu.merge(all_tx, on="State")
+        df["penetration"] = np.where(df["all_cnt"] == 0, 0, df["insu_cnt"] / df["all_cnt"])
+        return df.sort_values("penetration", ascending=False).reset_index(drop=True), None
+    return run_sql(f"""
+        WITH insu AS (
+            SELECT [State],
+                   SUM(CAST([Transacion_count] AS BIGINT)) AS insu_cnt
+            FROM {TABLES['agg_insu']}
+            WHERE 1=1 {sql_filters(year, state)}
+            GROUP BY [State]
+        ),
+        all_tx AS (
+            SELECT [State],
+                   SUM(CAST([Transacion_count] AS BIGINT)) AS all_cnt
+            FROM {TABLES['agg_trans']}
+            WHERE 1=1 {sql_filters(year, state)}
+            GROUP BY [State]
+        )
+        SELECT a.[State],
+               insu_cnt,
+               all_cnt,
+               CASE WHEN all_cnt=0 THEN 0
+                    ELSE 1.0*insu_cnt/all_cnt
+               END AS penetration
+        FROM insu a
+        JOIN all_tx b
+          ON a.[State] = b.[State]
+        ORDER BY penetration DESC;
+    """)
+
+
+def insu_type_mix(year="All", state="All"):
+    return agg_query(
+        "agg_insu", ("Transacion_type",), (("amt", "Transacion_amount"),),
+        year, state, order_by=(("amt", True),),
+    )
+
+
+# =========================================
+# 🌍 MARKET EXPANSION (agg_trans + map_tran)
+# =========================================
+def mkt_quarterly_count(year="All", state="All"):
+    return agg_query(
+        "agg_trans", ("Year", "Quater"), (("cnt", "Transacion_count"),),
+        year, state, order_by=(("Year", False), ("Quater", False)),
+    )
+
+
+def mkt_top_districts(year="All", state="All"):
+    return agg_query(
+        "map_tran", ("Districts",), (("cnt", "Transacion_count"),),
+        year, state, order_by=(("cnt", True),), top=30,
+    )
+
+
+def mkt_district_value_volume(year="All", state="All"):
+    return agg_query(
+        "map_tran", ("Districts",),
+        (("cnt", "Transacion_count"), ("amt", "Transacion_amount")),
+        year, state,
+    )
+
+
+def mkt_yoy_amount(year="All", state="All"):
+    # growth is ranked across all states, so only the year filter applies
+    if PARQUET_DIR:
+        return _parquet_yoy("Transacion_amount", "amt", year=year)
+    return run_sql(f"""
+        WITH yearly AS (
+            SELECT [State], [Year],
+                   SUM(CAST([Transacion_amount] AS BIGINT)) AS amt
+            FROM {TABLES['agg_trans']}
+            GROUP BY [State], [Year]
+        )
+        SELECT a.[State], a.[Year],
+               a.amt AS curr_amt,
+               b.amt AS prev_amt,
+               (a.amt - ISNULL(b.amt,0)) AS delta
+        FROM yearly a
+        LEFT JOIN yearly b
+               ON a.[State] = b.[State]
+              AND a.[Year]  = b.[Year] + 1
+        WHERE 1=1 {"" if year == "All" else f"AND a.Year = {year}"}
+        ORDER BY delta DESC;
+    """)
+
+
+# =========================================
+# 🚀 GROWTH STRATEGY (map_user + map_tran)
+# =========================================
+def growth_merged(year="All", state="All"):
+    """Join map_user and map_tran per State/Year/Quater/District and stream the totals.
+
+    Return ({"district": df, "state": df}, error_or_None), both with
+    users / opens / tx_cnt / tx_amt columns.
+    """
+    # read headers only (TOP 0), the rows are streamed below
+    header = parquet_columns if PARQUET_DIR else (
+        lambda name: run_sql(f"SELECT TOP 0 * FROM {TABLES[name]};")
+    )
+    mu, err = header("map_user")
+    if err or mu is None:
+        return None, err
+    mt, err = header("map_tran")
+    if err or mt is None:
+        return None, err
+
+    # detect columns again
+    state_mu = detect_column(mu, ["State"])
+    year_mu = detect_column(mu, ["Year"])
+    qtr_mu = detect_column(mu, ["Quater"])
+    dist_mu = detect_column(mu, ["Districts", "District"])
+    ru_col = detect_column(mu, ["RegisteredUsers", "RegisteredUserst"])
+    opens_col = detect_column(mu, ["AppOpens"])
+
+    state_mt = detect_column(mt, ["State"])
+    year_mt = detect_column(mt, ["Year"])
+    qtr_mt = detect_column(mt, ["Quater"])
+    dist_mt = detect_column(mt, ["Districts", "District"])
+    tx_cnt = detect_column(mt, ["Transacion_count"])
+    tx_amt = detect_column(mt, ["Transacion_amount"])
+
+    if not all(
+        [
+            state_mu,
+            year_mu,
+            qtr_mu,
+            dist_mu,
+            ru_col,
+            opens_col,
+            state_mt,
+            year_mt,
+            qtr_mt,
+            dist_mt,
+            tx_cnt,
+            tx_amt,
+        ]
+    ):
+        return None, KeyError("Missing expected columns in map_user / map_tran.")
+
+    measures = tuple((m, "sum") for m in ("users", "opens", "tx_cnt", "tx_amt"))
+    aggregates = {
+        "district": (("Districts",), measures),
+        "state": (("State",), measures),
+    }
+    if PARQUET_DIR:
+        return parquet_growth(
+            (state_mu, dist_mu, ru_col, opens_col),
+            (state_mt, dist_mt, tx_cnt, tx_amt),
+            year, state, aggregates,
+        )
+
+    # join on State + Year + Quater + Districts in SQL, then stream the
+    # joined rows so the merged frame is never materialized
+    filters = sql_filters(year, state)
+    q_merged = f"""
+        SELECT u.[{state_mu}] AS [State],
+               u.[{dist_mu}]  AS [Districts],
+               CAST(u.[{ru_col}]    AS BIGINT) AS users,
+               CAST(u.[{opens_col}] AS BIGINT) AS opens,
+               CAST(t.[{tx_cnt}]    AS BIGINT) AS tx_cnt,
+               CAST(t.[{tx_amt}]    AS BIGINT) AS tx_amt
+        FROM (SELECT * FROM {TABLES['map_user']} WHERE 1=1 {filters}) u
+        JOIN (SELECT * FROM {TABLES['map_tran']} WHERE 1=1 {filters}) t
+          ON u.[{state_mu}] = t.[{state_mt}]
+         AND u.[{year_mu}]  = t.[{year_mt}]
+         AND u.[{qtr_mu}]   = t.[{qtr_mt}]
+         AND u.[{dist_mu}]  = t.[{dist_mt}];
+    """
+    return run_sql_stream(q_merged, aggregates)
+
+
+@st.cache_data(ttl=300)
+def parquet_growth(mu_cols: tuple, mt_cols: tuple, year: str, state: str, aggregates: dict):
+    """growth_merged's join on the Parquet backend, one Year/Quater partition at a time.
+
+    Both datasets share the partitioning, so each partition pair is joined on
+    State + Districts alone and folded into the totals before the next is read.
+    """
+    state_mu, dist_mu, ru_col, opens_col = mu_cols
+    state_mt, dist_mt, tx_cnt, tx_amt = mt_cols
+
+    def merged_partitions():
+        both = set(parquet_partitions("map_user", year)) & set(parquet_partitions("map_tran", year))
+        for y, q in sorted(both):
+            u = read_parquet("map_user", mu_cols, y, state, q).rename(columns={
+                state_mu: "State", dist_mu: "Districts", ru_col: "users", opens_col: "opens",
+            })
+            t = read_parquet("map_tran", mt_cols, y, state, q).rename(columns={
+                state_mt: "State", dist_mt: "Districts", tx_cnt: "tx_cnt", tx_amt: "tx_amt",
+            })
+            yield u.merge(t, on=["State", "Districts"]).astype(
+                {"users": "int64", "opens": "int64", "tx_cnt": "int64", "tx_amt": "int64"}
+            )
+
+    try:
+        key = ("parquet_growth", mu_cols, mt_cols, year, state, repr(aggregates))
+        return shared(key, lambda: _aggregate_chunks(merged_partitions(), aggregates)), None
+    except Exception as e:
+        return None, e
+
+
+def gs_district_engagement(year="All", state="All"):
+    agg, err = growth_merged(year, state)
+    if err:
+        return None, err
+    return agg["district"][["Districts", "users", "opens", "tx_cnt"]].sort_values(
+        "tx_cnt", ascending=False
+    ), None
+
+
+def gs_state_users_tx(year="All", state="All"):
+    agg, err = growth_merged(year, state)
+    if err:
+        return None, err
+    return agg["state"][["State", "users", "tx_cnt"]].sort_values(
+        "tx_cnt", ascending=False
+    ), None
+
+
+def gs_state_per_user(year="All", state="All"):
+    agg, err = growth_merged(year, state)
+    if err:
+        return None, err
+    df = agg["state"][["State", "users", "opens", "tx_cnt"]].copy()
+    df["opens_per_user"] = df["opens"] / df["users"]
+    df["tx_per_user"] = df["tx_cnt"] / df["users"]
+    return df, None
+
+
+def gs_low_open_districts(year="All", state="All"):
+    agg, err = growth_merged(year, state)
+    if err:
+        return None, err
+    df = agg["district"][["Districts", "users", "opens"]].query("users > 0").copy()
+    df["opens_per_user"] = df["opens"] / df["users"]
+    return df.sort_values("opens_per_user").head(25), None
+
+
+def gs_high_value_districts(year="All", state="All"):
+    agg, err = growth_merged(year, state)
+    if err:
+        return None, err
+    return (
+        agg["district"][["Districts", "tx_amt"]]
+        .sort_values("tx_amt", ascending=False)
+        .head(25)
+    ), None
+
+
+# =========================================
+# PAGE -> NUMBERED BLOCKS
+# =========================================
+PAGES = {
+    "home": {
+        "kpi": home_kpi,
+        "map": home_state_totals,
+    },
+    "transaction-dynamics": {
+        "1": tx_top_states,
+        "2": tx_quarterly_amount,
+        "3": tx_type_split,
+        "4": tx_state_type_counts,
+        "5": tx_yoy_count,
+    },
+    "user-engagement": {
+        "1": ue_users_by_state,
+        "2": ue_opens_by_state,
+        "3": ue_opens_per_user,
+        "4": ue_top_districts,
+        "5": ue_opens_per_user,
+    },
+    "insurance-analysis": {
+        "1": insu_count_by_state,
+        "2": insu_amount_by_state,
+        "3": insu_yearly_amount,
+        "4": insu_penetration,
+        "5": insu_type_mix,
+    },
+    "market-expansion": {
+        "1": tx_top_states,
+        "2": mkt_quarterly_count,
+        "3": mkt_top_districts,
+        "4": mkt_district_value_volume,
+        "5": mkt_yoy_amount,
+    },
+    "growth-strategy": {
+        "1": gs_district_engagement,
+        "2": gs_state_users_tx,
+        "3": gs_state_per_user,
+        "4": gs_low_open_districts,
+        "5": gs_high_value_districts,
+    },
+}
@@ -0,0 +1,76 @@
+"""Parquet export of the nine ingested Pulse datasets.
+
+Each dataset is written hive-partitioned by dataset / Year / Quater:
+
+    <root>/dataset=agg_trans/Year=2022/Quater=1/part-0.parquet
+
+Inside every partition each State is written as its own row group(s), with
+min/max statistics, so a reader filtering on Year prunes whole directories
+and one filtering on State skips the other states' row groups (see
+pulse_data.read_parquet). A partition holds only a few hundred rows, so a
+size-based row group would cover every state and could never be skipped.
+Point PHONEPE_PARQUET_DIR at the root to run the dashboard off the directory.
+"""
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# the nine ETL frames, keyed by dataset name
+DATASETS = (
+    "agg_insu",
+    "agg_trans",
+    "agg_user",
+    "map_insu",
+    "map_tran",
+    "map_user",
+    "top_insu",
+    "top_tran",
+    "top_user",
+)
+# upper bound; a state with more rows in one partition gets several row groups
+ROW_GROUP_SIZE = 16384
+
+
+def default_root():
+    return os.environ.get("PHONEPE_PARQUET_DIR") or "parquet"
+
+
+def export_dataset(df, name, root=None, row_group_size=ROW_GROUP_SIZE):
+    """Write one ETL frame as <root>/dataset=<name>/Year=/Quater=/part-0.parquet.
+
+    Partitions present in df are replaced; other partitions are left alone.
+    """
+    root = os.path.join(root or default_root(), f"dataset={name}")
+    year = df["Year"].astype("int32")
+    quarter = df["Quater"].astype("int32")
+    # Year / Quater live in the directory names, not in the files
+    data = df.drop(columns=["Year", "Quater"])
+    schema = pa.Schema.from_pandas(data, preserve_index=False)
+    for (y, q), part in data.groupby([year, quarter]):
+        folder = os.path.join(root, f"Year={y}", f"Quater={q}")
+        os.makedirs(folder, exist_ok=True)
+        # readers skip dot files, so they never see the file half written
+        tmp = os.path.join(folder, f".part-0.parquet.{os.getpid()}.tmp")
+        with pq.ParquetWriter(tmp, schema, compression="zstd", write_statistics=True) as writer:
+            for _, rows in part.groupby("State", sort=True):
+                # each write_table call starts a new row group
+                writer.write_table(
+                    pa.Table.from_pandas(rows, schema=schema, preserve_index=False),
+                    row_group_size=row_group_size,
+                )
+        os.replace(tmp, os.path.join(folder, "part-0.parquet"))
+        for stale in os.listdir(folder):
+            if stale.endswith(".parquet") and stale != "part-0.parquet":
+                os.remove(os.path.join(folder, stale))
+
+
+def export_all(frames, root=None, row_group_size=ROW_GROUP_SIZE):
+    """Export {dataset name: DataFrame} for the nine datasets."""
+    unknown = set(frames) - set(DATASETS)
+    if unknown:
+        raise ValueError(f"unknown datasets: {sorted(unknown)}")
+    root = root or default_root()
+    for name, df in frames.items():
+        export_dataset(df, name, root, row_group_size)
+        print(f"✅ {name}: {len(df)} rows written to {root}")
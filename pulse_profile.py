@@ -0,0 +1,280 @@
+"""Opt-in sampling profiler for one Streamlit rerun of phonepe.py.
+
+Turn it on for every rerun with PHONEPE_PROFILE=1, or start the server with
+PHONEPE_PROFILE=query to profile only reruns opened with ?profile=1 in the
+page URL; without that opt-in the URL parameter is ignored, so visitors
+cannot make the server write files. A background thread samples the script thread's stack every
+PHONEPE_PROFILE_INTERVAL_MS milliseconds; each sample is attributed to the
+section the page last entered with section() (e.g. "Home / choropleth build").
+When the rerun finishes, three files are written to PHONEPE_PROFILE_DIR:
+
+    <stamp>-<pid>-<tid>-<page>.folded           collapsed stacks (flamegraph.pl, speedscope)
+    <stamp>-<pid>-<tid>-<page>.speedscope.json  speedscope sampled profile
+    <stamp>-<pid>-<tid>-<page>.txt              top-N hot functions and time per section
+
+<stamp> has millisecond resolution. A rerun that ends before finish_rerun()
+(a widget change, st.stop(), an exception) is written by the sampler as soon
+as the script's module frame leaves the stack, and marked interrupted.
+Only the newest PHONEPE_PROFILE_KEEP profiles (default 100) are kept.
+"""
+import os
+import re
+import sys
+import json
+import time
+import threading
+from collections import Counter
+
+PROFILE_DIR = os.environ.get("PHONEPE_PROFILE_DIR", "profiles")
+INTERVAL_MS = float(os.environ.get("PHONEPE_PROFILE_INTERVAL_MS", "5"))
+TOP_N = int(os.environ.get("PHONEPE_PROFILE_TOP", "25"))
+KEEP = int(os.environ.get("PHONEPE_PROFILE_KEEP", "100"))
+PROFILE_SUFFIXES = (".folded", ".speedscope.json", ".txt")
+
+# script thread id -> RerunProfiler; Streamlit runs each session's rerun in its own thread
+_active = {}
+_lock = threading.Lock()
+
+
+def enabled(query_params=None):
+    mode = os.environ.get("PHONEPE_PROFILE", "0")
+    if mode in ("", "0"):
+        return False
+    if mode != "query":
+        return True
+    # operator opted in to per-URL profiling
+    return query_params is not None and query_params.get("profile", "0") not in ("", "0")
+
+
+def prune(out_dir=PROFILE_DIR, keep=KEEP):
+    """Delete all but the newest keep profiles (each is three files) in out_dir."""
+    try:
+        names = os.listdir(out_dir)
+    except FileNotFoundError:
+        return
+    bases = sorted(
+        {n[: -len(sfx)] for n in names for sfx in PROFILE_SUFFIXES if n.endswith(sfx)},
+        reverse=True,  # names start with the timestamp
+    )
+    for base in bases[keep:]:
+        for sfx in PROFILE_SUFFIXES:
+            try:
+                os.remove(os.path.join(out_dir, base + sfx))
+            except FileNotFoundError:
+                pass
+
+
+class RerunProfiler:
+    """Samples one thread's stack at a fixed interval until stop()."""
+
+    def __init__(self, name, root_file=None, interval_ms=INTERVAL_MS, out_dir=PROFILE_DIR):
+        self.name = name
+        self.root_file = os.path.abspath(root_file) if root_file else None
+        self.interval = interval_ms / 1000.0
+        self.out_dir = out_dir
+        self.label = "setup"
+        self.samples = Counter()  # (label, stack) -> seconds
+        self.n_samples = 0
+        self.started = self.elapsed = self.started_wall = 0.0
+        self.interrupted = False
+        self.paths = None
+        self._target = threading.get_ident()
+        self._native_id = threading.get_native_id()
+        self._in_script = False
+        self._stop = threading.Event()
+        self._finish_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="pulse-profiler", daemon=True)
+
+    def start(self):
+        self.started, self.started_wall = time.perf_counter(), time.time()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def finish(self, blocking=True):
+        """Stop sampling and write the files, once; return their paths.
+
+        The sampler calls this with blocking=False, so it never waits on a
+        finish() that is itself joining the sampler.
+        """
+        if not self._finish_lock.acquire(blocking):
+            return None
+        try:
+            if self.paths is None:
+                self.stop()
+                self.paths = self.write()
+                with _lock:
+                    if _active.get(self._target) is self:
+                        del _active[self._target]
+            return self.paths
+        finally:
+            self._finish_lock.release()
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = self._stack(frame) if frame is not None else ()
+            in_script = bool(stack) and self._is_script(stack[0])
+            if frame is None or (self._in_script and not in_script):
+                # the rerun ended without reaching finish_rerun()
+                self.interrupted = True
+                self.finish(blocking=False)
+                return
+            self._in_script = self._in_script or in_script
+            # weight by the real gap: a GIL-bound script delays the sampler past the interval
+            now = time.perf_counter()
+            self.samples[(self.label, stack)] += now - last
+            self.n_samples += 1
+            last = now
+
+    def _is_script(self, fr):
+        return fr[0] == "<module>" and fr[1] == self.root_file
+
+    def _stack(self, frame):
+        """Root-first tuple of (function, file, first line), cut at the script module."""
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            if self._is_script(stack[-1]):
+                break
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    # ---- export ----
+    def write(self):
+        """Write the folded, speedscope and summary files; return their paths."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", self.name).strip("-").lower() or "rerun"
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_wall))
+        stamp += f".{int(self.started_wall * 1000) % 1000:03d}"
+        base = os.path.join(
+            self.out_dir, f"{stamp}-{os.getpid()}-{self._native_id}-{slug}"
+        )
+        paths = [base + sfx for sfx in PROFILE_SUFFIXES]
+        with open(paths[0], "w", encoding="utf-8") as f:
+            f.write(self.folded())
+        with open(paths[1], "w", encoding="utf-8") as f:
+            json.dump(self.speedscope(), f)
+        with open(paths[2], "w", encoding="utf-8") as f:
+            f.write(self.summary())
+        prune(self.out_dir)
+        return paths
+
+    @staticmethod
+    def _frame_name(fr):
+        name, path, line = fr
+        return f"{name} ({os.path.basename(path)}:{line})"
+
+    def folded(self):
+        lines = []
+        for (label, stack), secs in sorted(self.samples.items()):
+            names = [label] + [self._frame_name(fr).replace(";", ",") for fr in stack]
+            lines.append(f"{';'.join(names)} {round(secs * 1e6)}")  # microseconds
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self):
+        frames, index = [], {}
+
+        def frame_id(key, entry):
+            if key not in index:
+                index[key] = len(frames)
+                frames.append(entry)
+            return index[key]
+
+        samples, weights = [], []
+        for (label, stack), secs in self.samples.items():
+            ids = [frame_id(("section", label), {"name": label})]
+            for fr in stack:
+                ids.append(frame_id(fr, {"name": fr[0], "file": fr[1], "line": fr[2]}))
+            samples.append(ids)
+            weights.append(secs)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "pulse_profile",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": self.name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+
+    def summary(self, top_n=TOP_N):
+        total = sum(self.samples.values()) or 1
+        by_section, self_time, inclusive = Counter(), Counter(), Counter()
+        for (label, stack), secs in self.samples.items():
+            by_section[label] += secs
+            if stack:
+                self_time[stack[-1]] += secs
+            for fr in set(stack):
+                inclusive[fr] += secs
+
+        def ms(secs):
+            return secs * 1000
+
+        out = [
+            f"Profile: {self.name}" + (" (interrupted)" if self.interrupted else ""),
+            f"Wall time: {self.elapsed * 1000:.0f} ms, {self.n_samples} samples "
+            f"(target interval {self.interval * 1000:g} ms)",
+            "",
+            "Time by section:",
+        ]
+        for label, n in by_section.most_common():
+            out.append(f"  {ms(n):9.0f} ms  {100 * n / total:5.1f}%  {label}")
+        out += ["", f"Top {top_n} functions by self time:"]
+        for fr, n in self_time.most_common(top_n):
+            out.append(f"  {ms(n):9.0f} ms  {100 * n / total:5.1f}%  {self._frame_name(fr)}")
+        out += ["", f"Top {top_n} functions by total time:"]
+        for fr, n in inclusive.most_common(top_n):
+            out.append(f"  {ms(n):9.0f} ms  {100 * n / total:5.1f}%  {self._frame_name(fr)}")
+        return "\n".join(out) + "\n"
+
+
+# =========================================
+# RERUN HOOKS (used by phonepe.py)
+# =========================================
+def start_rerun(query_params=None, root_file=None, name="rerun"):
+    """Start profiling the calling thread's rerun if enabled; return the profiler or None."""
+    tid = threading.get_ident()
+    with _lock:
+        stale = _active.pop(tid, None)
+    if stale is not None:  # previous rerun was interrupted before finish_rerun()
+        stale.interrupted = True
+        stale.finish()
+    if not enabled(query_params):
+        return None
+    prof = RerunProfiler(name, root_file=root_file).start()
+    with _lock:
+        _active[tid] = prof
+    return prof
+
+
+def section(label):
+    """Attribute the following samples of this rerun to label (no-op when not profiling)."""
+    prof = _active.get(threading.get_ident())
+    if prof is not None:
+        prof.label = label
+
+
+def finish_rerun():
+    """Stop this thread's profiler and write its files; return the paths or []."""
+    with _lock:
+        prof = _active.pop(threading.get_ident(), None)
+    if prof is None:
+        return []
+    return prof.finish() or []
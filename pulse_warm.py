@@ -0,0 +1,85 @@
+"""Post-ingest cache warmer.
+
+Runs every page block for every sidebar combination, ("All" + each year) x
+("All" + each state), across a process pool. Each result lands in the shared
+disk cache (see pulse_data.CACHE_DIR) under the current data version, so the
+first dashboard or API request for any filter is already a hit.
+
+    python pulse_warm.py --workers 8
+
+Run it after each load (the last cell of Data_Extraction_and_Transformation.ipynb does).
+"""
+import os
+import time
+import argparse
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pulse_data
+
+
+def combinations():
+    years = ["All"] + pulse_data.available_years()
+    states = ["All"] + pulse_data.available_states()
+    return list(product(years, states))
+
+
+def _init_worker(version):
+    # never reuse connections inherited from the parent over a fork
+    if pulse_data.engine is not None:
+        pulse_data.engine.dispose(close=False)
+    # every worker files its results under the parent's data version
+    pulse_data.pin_data_version(version)
+
+
+def warm_combination(year, state):
+    """Compute every page block for one (year, state); return (year, state, ok, errors)."""
+    ok, errors, seen = 0, [], set()
+    for page, blocks in pulse_data.PAGES.items():
+        for block, fn in blocks.items():
+            if fn in seen:  # blocks shared between pages are computed once
+                continue
+            seen.add(fn)
+            _, err = fn(year, state)
+            if err:
+                errors.append(f"{page}/{block}: {err}")
+            else:
+                ok += 1
+    return year, state, ok, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the PhonePe Pulse dashboard caches")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--keep-old", action="store_true", help="keep caches of older data versions")
+    args = parser.parse_args()
+
+    version = pulse_data.data_version()
+    if version is None:
+        raise SystemExit("Could not read the data version; is the database (or PHONEPE_PARQUET_DIR) reachable?")
+    pulse_data.pin_data_version(version)
+    if not pulse_data.CACHE_DIR:
+        raise SystemExit("PHONEPE_CACHE_DIR is empty, nothing to warm.")
+    if not args.keep_old:
+        for old in pulse_data.prune_cache(version):
+            print(f"removed cache for data version {old}")
+
+    combos = combinations()
+    print(f"warming {len(combos)} filter combinations for data version {version} "
+          f"with {args.workers} workers")
+    started, failed = time.perf_counter(), 0
+    with ProcessPoolExecutor(
+        max_workers=args.workers, initializer=_init_worker, initargs=(version,)
+    ) as pool:
+        futures = [pool.submit(warm_combination, year, state) for year, state in combos]
+        for done, future in enumerate(as_completed(futures), 1):
+            year, state, ok, errors = future.result()
+            failed += len(errors)
+            print(f"[{done}/{len(combos)}] year={year} state={state}: {ok} blocks")
+            for e in errors:
+                print(f"    failed {e}")
+    print(f"done in {time.perf_counter() - started:.1f}s, {failed} failed blocks")
+
+
+if __name__ == "__main__":
+    main()
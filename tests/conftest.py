@@ -0,0 +1,101 @@
+import os
+import re
+import sys
+
+import pandas as pd
+import pytest
+import streamlit as st
+from sqlalchemy import create_engine, event
+
+# the modules live at the repository root, next to phonepe.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pulse_data  # noqa: E402
+
+STATES = ("Goa", "Kerala", "Assam")
+YEARS = (2021, 2022)
+QUARTERS = (1, 2, 3, 4)
+
+
+def pulse_frames():
+    """Small ETL-shaped frames for the five SQL tables, keyed like pulse_data.TABLES.
+
+    Amounts are floats with paise, as the ETL reads them from the Pulse JSON.
+    """
+    trans = [
+        (
+            state, year, quarter, kind,
+            10 * quarter + i + len(kind),
+            1000 * quarter + 50 * len(kind) + 7 * i + year % 100 + 0.75,
+        )
+        for i, state in enumerate(STATES)
+        for year in YEARS
+        for quarter in QUARTERS
+        for kind in ("p2p", "merchant")
+    ]
+    districts = [
+        (state, year, quarter, f"{state} district {d}", 100 * d + quarter + i, 40 * d + year % 10)
+        for i, state in enumerate(STATES)
+        for year in YEARS
+        for quarter in QUARTERS
+        for d in range(1, 5)
+    ]
+    agg = ["State", "Year", "Quater", "Transacion_type", "Transacion_count", "Transacion_amount"]
+    agg_trans = pd.DataFrame(trans, columns=agg)
+    agg_insu = agg_trans.assign(Transacion_count=agg_trans["Transacion_count"] // 4)
+    map_user = pd.DataFrame(
+        districts, columns=["State", "Year", "Quater", "Districts", "RegisteredUsers", "AppOpens"]
+    )
+    map_tran = pd.DataFrame(
+        districts, columns=["State", "Year", "Quater", "Districts", "Transacion_count", "Transacion_amount"]
+    ).assign(Transacion_amount=lambda df: df["Transacion_amount"] * 25 + 0.6)
+    return {
+        "agg_trans": agg_trans,
+        "agg_insu": agg_insu,
+        "map_user": map_user,
+        "map_tran": map_tran,
+        "top_tran": agg_trans.head(6),
+    }
+
+
+def _tsql_to_sqlite(conn, cursor, statement, parameters, context, executemany):
+    """Rewrite the bits of T-SQL pulse_data uses that SQLite spells differently."""
+    top = re.search(r"SELECT TOP (\d+) ", statement)
+    if top:
+        statement = statement.replace(top.group(0), "SELECT ").rstrip().rstrip(";")
+        statement += f" LIMIT {top.group(1)};"
+    return statement.replace("ISNULL(", "IFNULL("), parameters
+
+
+@pytest.fixture
+def fresh_process():
+    """Call to drop what a new process would not have: in-memory results and st caches."""
+
+    def clear():
+        pulse_data._results.clear()
+        st.cache_data.clear()
+
+    clear()
+    yield clear
+    clear()
+
+
+@pytest.fixture
+def pulse_db(tmp_path, monkeypatch, fresh_process):
+    """pulse_data on a SQLite copy of pulse_frames() with its own disk cache.
+
+    Yields the SQL statements run against it, in order.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'pulse.db'}")
+    for name, df in pulse_frames().items():
+        df.to_sql(pulse_data.TABLES[name], engine, index=False)
+
+    event.listen(engine, "before_cursor_execute", _tsql_to_sqlite, retval=True)
+    seen = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: seen.append(sql))
+    monkeypatch.setattr(pulse_data, "engine", engine)
+    monkeypatch.setattr(pulse_data, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(pulse_data, "PARQUET_DIR", "")
+    monkeypatch.setattr(pulse_data, "_pinned_version", "test")
+    yield seen
+    engine.dispose()
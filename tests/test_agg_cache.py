@@ -0,0 +1,50 @@
+"""agg_query results must outlive the process that computed them (pulse_warm -> dashboard)."""
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, event
+
+import pulse_data
+
+
+@pytest.fixture
+def statements(tmp_path, monkeypatch, fresh_process):
+    """pulse_data on a SQLite Agg_trans with its own disk cache; collects the SQL it runs."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'pulse.db'}")
+    rows = [
+        (state, year, quarter, "p2p", 10 * quarter, 100 * quarter)
+        for state in ("Goa", "Kerala")
+        for year in (2021, 2022)
+        for quarter in (1, 2)
+    ]
+    pd.DataFrame(
+        rows,
+        columns=["State", "Year", "Quater", "Transacion_type", "Transacion_count", "Transacion_amount"],
+    ).to_sql("Agg_trans", engine, index=False)
+
+    seen = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: seen.append(sql))
+    monkeypatch.setattr(pulse_data, "engine", engine)
+    monkeypatch.setattr(pulse_data, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(pulse_data, "PARQUET_DIR", "")
+    monkeypatch.setattr(pulse_data, "_pinned_version", "test")
+    yield seen
+
+
+def test_warmed_subsumed_answers_are_disk_hits_in_a_fresh_process(statements, fresh_process):
+    # what pulse_warm.warm_combination does for these blocks, broadest filter first
+    for year, state in [("All", "All"), ("All", "Kerala"), ("2022", "All"), ("2022", "Kerala")]:
+        for block in (pulse_data.home_state_totals, pulse_data.tx_top_states):
+            _, err = block(year, state)
+            assert err is None
+    assert pulse_data.cache_stats()["subsumed_hits"] > 0
+
+    fresh_process()
+    statements.clear()
+    before = pulse_data.cache_stats()["disk_hits"]
+
+    df, err = pulse_data.home_state_totals("2022", "Kerala")
+
+    assert err is None
+    assert statements == []
+    assert pulse_data.cache_stats()["disk_hits"] == before + 1
+    assert df.to_dict("records") == [{"State": "Kerala", "total_amount": 300, "total_count": 30}]
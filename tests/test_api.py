@@ -0,0 +1,67 @@
+"""PulseHandler: ETag revalidation and filter validation."""
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import pulse_api
+import pulse_data
+
+
+@pytest.fixture
+def get(pulse_db):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), pulse_api.PulseHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def request(path, **headers):
+        url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as r:
+                return r.status, r.headers, r.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+    yield request
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_block_revalidates_with_etag_without_querying(get, pulse_db):
+    status, headers, body = get("/api/home/map?year=2022&state=Kerala")
+    etag = headers["ETag"]
+    assert status == 200
+    assert etag and b"Kerala" in body
+
+    pulse_db.clear()
+    status, headers, body = get("/api/home/map?year=2022&state=Kerala", **{"If-None-Match": etag})
+
+    assert status == 304
+    assert headers["ETag"] == etag
+    assert body == b""
+    assert pulse_db == []
+
+
+def test_etag_depends_on_the_filters_and_the_data_version(get, monkeypatch):
+    etag = get("/api/home/map?year=2022")[1]["ETag"]
+    assert get("/api/home/map?year=2021", **{"If-None-Match": etag})[0] == 200
+
+    monkeypatch.setattr(pulse_data, "_pinned_version", "reloaded")
+    assert get("/api/home/map?year=2022", **{"If-None-Match": etag})[0] == 200
+
+
+@pytest.mark.parametrize(
+    "path, status",
+    [
+        ("/api/home/map?year=1999", 400),
+        ("/api/home/map?state=Goa';--", 400),
+        ("/api/home/map?format=xml", 400),
+        ("/api/home/99", 404),
+        ("/nope", 404),
+    ],
+)
+def test_rejects_unknown_filters_and_paths(get, path, status):
+    assert get(path)[0] == status
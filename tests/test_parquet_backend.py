@@ -0,0 +1,54 @@
+"""Every dashboard block returns the same numbers off a Parquet export as off SQL."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import pulse_data
+import pulse_parquet
+from conftest import pulse_frames
+
+FILTERS = [(year, state) for year in ("All", "2022") for state in ("All", "Kerala")]
+BLOCKS = [
+    (page, block, fn) for page, blocks in pulse_data.PAGES.items() for block, fn in blocks.items()
+]
+
+
+def normalized(df):
+    """Missing values as NaN, as SQL hands back None where pandas has NaN."""
+    return df.fillna(np.nan).infer_objects().reset_index(drop=True)
+
+
+@pytest.fixture
+def both_backends(pulse_db, tmp_path, monkeypatch, fresh_process):
+    """Run a block on SQL, then on a Parquet export of the same frames."""
+    root = tmp_path / "parquet"
+    pulse_parquet.export_all(pulse_frames(), str(root))
+
+    def run(fn, year, state):
+        monkeypatch.setattr(pulse_data, "PARQUET_DIR", "")
+        fresh_process()
+        sql, err = fn(year, state)
+        assert err is None
+        monkeypatch.setattr(pulse_data, "PARQUET_DIR", str(root))
+        fresh_process()
+        parquet, err = fn(year, state)
+        assert err is None
+        return sql, parquet
+
+    monkeypatch.setattr(pulse_data, "CACHE_DIR", "")  # each backend computes its own answer
+    return run
+
+
+@pytest.mark.parametrize("year, state", FILTERS)
+@pytest.mark.parametrize("page, block, fn", BLOCKS, ids=[f"{p}/{b}" for p, b, _ in BLOCKS])
+def test_block_matches_sql(both_backends, page, block, fn, year, state):
+    sql, parquet = both_backends(fn, year, state)
+    if isinstance(sql, dict):  # user_engagement-style blocks return named frames
+        sql, parquet = sql["state"], parquet["state"]
+    sql, parquet = normalized(sql), normalized(parquet)
+
+    assert list(parquet.columns) == list(sql.columns)
+    for col in sql.columns:
+        if pd.api.types.is_integer_dtype(sql[col]):
+            assert pd.api.types.is_integer_dtype(parquet[col]), col
+    pd.testing.assert_frame_equal(parquet, sql, check_dtype=False)
@@ -0,0 +1,43 @@
+"""pulse_parquet lays every partition out so State filters can skip row groups."""
+import pyarrow.parquet as pq
+
+import pulse_parquet
+from conftest import STATES, pulse_frames
+
+
+def partition(root, name, year, quarter):
+    return root / f"dataset={name}" / f"Year={year}" / f"Quater={quarter}" / "part-0.parquet"
+
+
+def test_each_state_is_its_own_row_group(tmp_path):
+    pulse_parquet.export_dataset(pulse_frames()["map_user"], "map_user", tmp_path)
+
+    meta = pq.ParquetFile(partition(tmp_path, "map_user", 2022, 3)).metadata
+    state = meta.schema.names.index("State")
+    stats = [meta.row_group(i).column(state).statistics for i in range(meta.num_row_groups)]
+
+    assert meta.num_row_groups == len(STATES)
+    assert [(s.min, s.max) for s in stats] == [(s, s) for s in sorted(STATES)]
+    assert "Year" not in meta.schema.names and "Quater" not in meta.schema.names
+
+
+def test_row_group_size_splits_a_large_state(tmp_path):
+    pulse_parquet.export_dataset(pulse_frames()["map_user"], "map_user", tmp_path, row_group_size=3)
+
+    meta = pq.ParquetFile(partition(tmp_path, "map_user", 2021, 1)).metadata
+
+    # four districts per state: 3 + 1 rows, never mixing two states
+    assert [meta.row_group(i).num_rows for i in range(meta.num_row_groups)] == [3, 1] * len(STATES)
+
+
+def test_reexport_replaces_only_the_partitions_it_holds(tmp_path):
+    users = pulse_frames()["map_user"]
+    pulse_parquet.export_dataset(users, "map_user", tmp_path)
+    kept = partition(tmp_path, "map_user", 2021, 1).stat().st_mtime_ns
+
+    pulse_parquet.export_dataset(users[users["Year"] == 2022], "map_user", tmp_path)
+
+    assert partition(tmp_path, "map_user", 2021, 1).stat().st_mtime_ns == kept
+    assert sorted(p.name for p in partition(tmp_path, "map_user", 2022, 1).parent.iterdir()) == [
+        "part-0.parquet"
+    ]
@@ -0,0 +1,132 @@
+"""Concurrent misses for one key run the query once, across threads and processes."""
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import pulse_data
+
+KEY = ("agg", "agg_trans", ("State",))
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """A shared disk cache with short lock timeouts; yields the lock file for KEY."""
+    monkeypatch.setattr(pulse_data, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(pulse_data, "_pinned_version", "test")
+    monkeypatch.setattr(pulse_data, "SINGLE_FLIGHT_WAIT", 0.6)
+    monkeypatch.setattr(pulse_data, "LOCK_POLL", 0.01)
+    path = pulse_data._cache_file(KEY)
+    os.makedirs(os.path.dirname(path))
+    yield path + ".lock"
+
+
+def hold(lock, token="other-process", age=0.0):
+    with open(lock, "w", encoding="ascii") as f:
+        f.write(token)
+    stamp = time.time() - age
+    os.utime(lock, (stamp, stamp))
+
+
+def test_single_flight_runs_fn_once_for_concurrent_callers():
+    calls, results = [], []
+    start = threading.Barrier(6)
+
+    def query():
+        calls.append(1)
+        time.sleep(0.2)
+        return pd.DataFrame({"n": [1, 2]})
+
+    def caller():
+        start.wait()
+        results.append(pulse_data.single_flight(("test", "coalesce"), query))
+
+    threads = [threading.Thread(target=caller) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert sorted(coalesced for _, coalesced in results) == [False] + [True] * 5
+    frames = [df for df, _ in results]
+    assert all(df.equals(frames[0]) for df in frames)
+    # followers get their own copy
+    assert len({id(df) for df in frames}) == 6
+
+
+def test_single_flight_followers_retry_after_the_leader_fails():
+    calls = []
+    start = threading.Barrier(3)
+
+    def query():
+        calls.append(threading.get_ident())
+        time.sleep(0.1)
+        if len(calls) == 1:
+            raise RuntimeError("leader failed")
+        return 1
+
+    outcomes = []
+
+    def caller():
+        start.wait()
+        try:
+            outcomes.append(pulse_data.single_flight(("test", "fail"), query))
+        except RuntimeError:
+            outcomes.append("error")
+
+    threads = [threading.Thread(target=caller) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(map(str, outcomes)) == ["(1, False)", "(1, False)", "error"]
+    assert len(calls) == 3
+
+
+def test_compute_once_waits_for_a_live_lock_and_shares_its_value(cache):
+    hold(cache)
+
+    def leader_finishes():
+        time.sleep(0.3)
+        pulse_data.cache_put("from the other process", *KEY)
+        os.remove(cache)
+
+    threading.Thread(target=leader_finishes).start()
+
+    value, origin = pulse_data._compute_once(KEY, lambda: pytest.fail("computed twice"))
+
+    assert (value, origin) == ("from the other process", "coalesced")
+
+
+def test_compute_once_breaks_a_lock_nobody_refreshes(cache):
+    hold(cache, age=10)
+
+    value, origin = pulse_data._compute_once(KEY, lambda: "recomputed")
+
+    assert (value, origin) == ("recomputed", "computed")
+    assert pulse_data.cache_get(*KEY) == "recomputed"
+    assert not os.path.exists(cache)
+
+
+def test_compute_once_keeps_its_lock_fresh_while_computing(cache):
+    ages = []
+
+    def slow():
+        time.sleep(pulse_data.SINGLE_FLIGHT_WAIT * 1.5)
+        ages.append(time.time() - os.path.getmtime(cache))
+        return "slow"
+
+    assert pulse_data._compute_once(KEY, slow) == ("slow", "computed")
+    assert ages[0] < pulse_data.SINGLE_FLIGHT_WAIT
+
+
+def test_release_leaves_a_lock_taken_over_by_someone_else(cache):
+    hold(cache, token="new-owner")
+
+    pulse_data._release(cache, "old-owner")
+
+    assert pulse_data._lock_owner(cache) == "new-owner"
@@ -0,0 +1,68 @@
+"""Chunked aggregation must give the same totals as aggregating everything at once."""
+import pandas as pd
+
+import pulse_data
+from conftest import pulse_frames
+
+AGGREGATES = {
+    "by_state": (("State",), (("RegisteredUsers", "sum"), ("AppOpens", "sum"))),
+    "by_district": (("State", "Districts"), (("AppOpens", "sum"), ("Quater", "count"))),
+}
+
+
+def expected(df):
+    return {
+        name: df.groupby(list(keys), as_index=False).agg(dict(aggs))
+        for name, (keys, aggs) in AGGREGATES.items()
+    }
+
+
+def chunks_of(df, size):
+    return (df.iloc[i:i + size] for i in range(0, len(df), size))
+
+
+def assert_same(got, want):
+    assert set(got) == set(want)
+    for name in want:
+        keys = list(AGGREGATES[name][0])
+        pd.testing.assert_frame_equal(
+            got[name].sort_values(keys).reset_index(drop=True),
+            want[name].sort_values(keys).reset_index(drop=True),
+            check_dtype=False,
+        )
+
+
+def test_aggregate_chunks_with_small_chunks_matches_groupby():
+    users = pulse_frames()["map_user"]
+
+    got = pulse_data._aggregate_chunks(chunks_of(users, 3), AGGREGATES)
+
+    assert_same(got, expected(users))
+
+
+def test_aggregate_chunks_without_rows_keeps_the_columns():
+    got = pulse_data._aggregate_chunks(iter(()), AGGREGATES)
+
+    assert list(got["by_district"].columns) == ["State", "Districts", "AppOpens", "Quater"]
+    assert got["by_district"].empty
+
+
+def test_run_sql_stream_reads_in_chunks(pulse_db, monkeypatch):
+    sizes = []
+    aggregate_chunks = pulse_data._aggregate_chunks
+
+    def recording(chunks, aggregates):
+        def seen():
+            for chunk in chunks:
+                sizes.append(len(chunk))
+                yield chunk
+        return aggregate_chunks(seen(), aggregates)
+
+    monkeypatch.setattr(pulse_data, "_aggregate_chunks", recording)
+
+    got, err = pulse_data.run_sql_stream("SELECT * FROM map_user;", AGGREGATES, chunksize=2)
+
+    assert err is None
+    users = pulse_frames()["map_user"]
+    assert sizes == [2] * (len(users) // 2)
+    assert_same(got, expected(users))
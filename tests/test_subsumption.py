@@ -0,0 +1,87 @@
+"""A broader cached result must answer a narrower agg_query exactly as SQL would."""
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+import pulse_data
+
+TRANS = (("cnt", "Transacion_count"), ("amt", "Transacion_amount"))
+
+
+def key(group_by, measures=TRANS, year="All", state="All", top=None, order_by=()):
+    return ("agg_trans", tuple(group_by), tuple(measures), year, state, top, tuple(order_by))
+
+
+def direct(k):
+    table, group_by, measures, year, state, top, order_by = k
+    sql = pulse_data._agg_sql(table, group_by, measures, year, state, order_by, top)
+    return pd.read_sql(text(sql), pulse_data.engine)
+
+
+def ordered(df):
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+@pytest.mark.parametrize(
+    "cached, wanted",
+    [
+        # a single state out of the per-state totals
+        (key(("State",)), key(("State",), state="Kerala")),
+        # one year out of a Year x State breakdown, re-aggregated per state
+        (key(("Year", "State")), key(("State",), year="2022")),
+        # a KPI (no group) for one state and year, with a measure subset and aliases
+        (key(("Year", "State")), key((), (("total", "Transacion_amount"),), "2021", "Goa")),
+        # already filtered on year, still grouped by state
+        (key(("State", "Quater"), year="2022"), key(("Quater",), year="2022", state="Assam")),
+        # ordering and TOP applied locally
+        (
+            key(("State", "Transacion_type")),
+            key(("State",), top=2, order_by=(("amt", True),)),
+        ),
+    ],
+)
+def test_answer_from_matches_direct_sql(pulse_db, cached, wanted):
+    assert pulse_data._subsumes(cached, wanted)
+
+    got = pulse_data._answer_from(cached, direct(cached), wanted)
+    expected = direct(wanted)
+
+    assert list(got.columns) == list(expected.columns)
+    if wanted[5]:  # TOP: the order is part of the answer
+        pd.testing.assert_frame_equal(got, expected)
+    else:
+        pd.testing.assert_frame_equal(ordered(got), ordered(expected))
+
+
+@pytest.mark.parametrize(
+    "cached, wanted",
+    [
+        # TOP dropped rows the narrower query may need
+        (key(("State",), top=2), key(("State",), state="Goa")),
+        # filtered to another state
+        (key(("Year",), state="Goa"), key(("Year",), state="Kerala")),
+        # a state filter needs State among the cached groups
+        (key(("Year",)), key(("Year",), state="Goa")),
+        # measure not in the cached result
+        (key(("State",), (("cnt", "Transacion_count"),)), key(("State",))),
+        # another table
+        (("agg_insu",) + key(("State",))[1:], key(("State",))),
+    ],
+)
+def test_subsumes_rejects_results_that_cannot_answer(cached, wanted):
+    assert not pulse_data._subsumes(cached, wanted)
+
+
+def test_narrow_blocks_are_answered_locally_after_a_broad_one(pulse_db):
+    pulse_data.home_state_totals("All", "All")
+    pulse_db.clear()
+    before = pulse_data.cache_stats()["subsumed_hits"]
+
+    df, err = pulse_data.home_state_totals("All", "Kerala")
+
+    assert err is None
+    assert pulse_db == []
+    assert pulse_data.cache_stats()["subsumed_hits"] == before + 1
+    measures = (("total_amount", "Transacion_amount"), ("total_count", "Transacion_count"))
+    expected = direct(key(("State",), measures, state="Kerala"))
+    assert df.to_dict("records") == expected.to_dict("records")